@@ -11,6 +11,10 @@ def create_app() -> Flask:
         PROPAGATE_EXCEPTIONS=True,
     )
 
+    # .env must be in the environment before the blueprints build their agents and models
+    from core.models.generator import load_env_once
+    load_env_once()
+
     # Register blueprints
     from .routes.home_routes import bp as home_bp
     from .routes.map_routes import bp as map_bp
@@ -196,8 +196,8 @@ def api_graph_collective():
 
 @bp.route("/api/graph/reset", methods=["POST"])
 def api_graph_reset():
-    # Reset only ideas and graph (edges) – do not touch chunks or voice profiles
-    db.delete_all_edges()
+    # Reset only ideas and graph (edges) – do not touch chunks or voice profiles.
+    # delete_all_idea_nodes clears edges in the same transaction.
     db.delete_all_idea_nodes()
     try:
         chroma.clear_ideas()
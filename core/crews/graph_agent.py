@@ -2,10 +2,12 @@ from __future__ import annotations
 import json
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
 from core.database.sqlite_manager import SQLiteManager
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
-from core.utils.graph_utils import cosine_similarity, kmeans, top_tokens
+from core.utils.graph_utils import cosine_similarity, kmeans_np, top_tokens
 
 
 class GraphAgent:
@@ -39,6 +41,22 @@ class GraphAgent:
             return self.embedder.embed_text(content)
         return None
     
+    def get_idea_embeddings(self, node_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Embeddings for many ideas in one Chroma read, keyed by node_id (float32 rows).
+
+        Ids missing from the vector store fall back to get_idea_embedding one by one.
+        """
+        if not node_ids:
+            return {}
+        ids, mat, _ = self.chroma.get_ideas_arrays(ids=list(node_ids))
+        out: Dict[str, np.ndarray] = {nid: mat[i] for i, nid in enumerate(ids) if i < len(mat)}
+        for nid in node_ids:
+            if nid not in out:
+                emb = self.get_idea_embedding(nid)
+                if emb:
+                    out[nid] = np.asarray(emb, dtype=np.float32)
+        return out
+
     def weight_from_distance(self, d: Optional[float]) -> float:
         if d is None:
             return 0.0
@@ -65,6 +83,7 @@ class GraphAgent:
         emb = self.get_idea_embedding(node_id)
         if not emb:
             return []
+        q = np.asarray(emb, dtype=np.float32)
 
         # Source tags
         src = self.db.get_idea_node(node_id) or {}
@@ -91,50 +110,51 @@ class GraphAgent:
         if not ids or len(ids) <= (1 if exclude_self else 0):
             try:
                 # Pull a recent candidate pool from the same profile
-                candidates = self.db.list_idea_nodes(limit=200, user_id=src.get("user_id"), voice_profile_id=src.get("voice_profile_id"))
-                sims: List[Tuple[str, float]] = []
-                for c in candidates:
-                    cid = c.get("node_id")
-                    if not cid or (exclude_self and cid == node_id):
-                        continue
-                    cemb = self.get_idea_embedding(cid)
-                    if not cemb:
-                        # embed from content as last resort
-                        content = (c.get("content") or "").strip()
-                        cemb = self.embedder.embed_text(content) if content else None
-                    if not cemb:
-                        continue
-                    # cosine on normalized vectors = dot
-                    try:
-                        cos = sum(a*b for a, b in zip(emb, cemb))
-                    except Exception:
-                        cos = 0.0
-                    sims.append((cid, float(cos)))
-                # Rank by cosine desc and take top_k
-                sims.sort(key=lambda x: x[1], reverse=True)
-                sims = sims[:top_k]
-                # Convert to ids/dists using a cosine->distance mapping (1 - cos)
-                ids = [s[0] for s in sims]
-                dists = [max(0.0, 1.0 - s[1]) for s in sims]
+                rows = self.db.iter_idea_rows(("node_id", "content"), limit=200, user_id=src.get("user_id"), voice_profile_id=src.get("voice_profile_id"))
+                pool = [(r["node_id"], r["content"]) for r in rows if r["node_id"] and not (exclude_self and r["node_id"] == node_id)]
+                ids2, mat, _ = self.chroma.get_ideas_arrays(ids=[cid for cid, _ in pool]) if pool else ([], None, [])
+                vecs = {cid: mat[i] for i, cid in enumerate(ids2) if i < len(mat)}
+                # embed from content as last resort, in one batch
+                missing = [(cid, c.strip()) for cid, c in pool if cid not in vecs and (c or "").strip()]
+                if missing:
+                    for (cid, _), v in zip(missing, self.embedder.embed_texts([c for _, c in missing])):
+                        vecs[cid] = np.asarray(v, dtype=np.float32)
+                cand = [cid for cid, _ in pool if cid in vecs and len(vecs[cid]) == len(q)]
+                if cand:
+                    # cosine on normalized vectors = dot, for the whole pool in one matmul
+                    scores = np.stack([vecs[cid] for cid in cand]) @ q
+                    k = min(top_k, len(cand))
+                    top = np.argpartition(-scores, k - 1)[:k]
+                    top = top[np.argsort(-scores[top], kind="stable")]
+                    ids = [cand[i] for i in top]
+                    # Convert to dists using a cosine->distance mapping (1 - cos)
+                    dists = [max(0.0, 1.0 - float(scores[i])) for i in top]
+                else:
+                    ids, dists = [], []
             except Exception:
                 # keep empty
                 ids, dists = [], []
 
         results: List[Dict] = []
+        # Accepted edges are written together at the end: one transaction instead of one per edge
+        pending: List[Tuple[str, str, str, float, Dict]] = []
+        # Neighbor embeddings in one read; cosines against the source in one matmul
+        nbr_ids = [rid for rid in ids if not (exclude_self and rid == node_id)]
+        nbr_vecs = self.get_idea_embeddings(nbr_ids)
+        nbr_cos: Dict[str, float] = {}
+        same_dim = [rid for rid in nbr_ids if rid in nbr_vecs and len(nbr_vecs[rid]) == len(q)]
+        if same_dim:
+            for rid, c in zip(same_dim, (np.stack([nbr_vecs[rid] for rid in same_dim]) @ q).tolist()):
+                nbr_cos[rid] = c
         for i, rid in enumerate(ids):
             if exclude_self and rid == node_id:
                 continue
 
             dist = dists[i] if i < len(dists) else None
 
-            # Retrieve destination embedding and compute cosine now so we can use it as an alternative allow-path
-            dst_emb = self.get_idea_embedding(rid)
-            cos_val: Optional[float] = None
-            if dst_emb is not None:
-                try:
-                    cos_val = sum(a*b for a, b in zip(emb, dst_emb))
-                except Exception:
-                    cos_val = None
+            # Destination cosine (precomputed above) is an alternative allow-path
+            dst_vec = nbr_vecs.get(rid)
+            cos_val: Optional[float] = nbr_cos.get(rid)
             # Tag overlap screen
             dst = self.db.get_idea_node(rid) or {}
             dst_tags_txt = (dst.get("tags") or "")
@@ -158,9 +178,9 @@ class GraphAgent:
             allowed = allowed_distance or allowed_cosine
 
             # Mutual nearest neighbor (optional) to reduce spurious links
-            if allowed and require_mutual and dst_emb is not None:
+            if allowed and require_mutual and dst_vec is not None:
                 try:
-                    qr2 = self.chroma.query_ideas(query_embedding=dst_emb, n_results=top_k + (1 if exclude_self else 0))
+                    qr2 = self.chroma.query_ideas(query_embedding=dst_vec.tolist(), n_results=top_k + (1 if exclude_self else 0))
                     ids2 = qr2.get("ids") or [[]]
                     ids2 = ids2[0] if ids2 and isinstance(ids2[0], list) else ids2
                     if node_id not in ids2:
@@ -175,31 +195,34 @@ class GraphAgent:
             # Skip duplicates (directed)
             if self.db.edge_exists(src_id=node_id, dst_id=rid, edge_type="similar"):
                 continue
-            edge_id = self.db.create_edge(
-                src_id=node_id,
-                dst_id=rid,
-                edge_type="similar",
-                weight=weight,
-                metadata={
+            pending.append((
+                node_id,
+                rid,
+                "similar",
+                weight,
+                {
                     "distance": dist,
                     "tag_overlap": overlap,
                     "src_tags": ",".join(sorted(src_tags)) if src_tags else "",
                     "dst_tags": ",".join(sorted(dst_tags)) if dst_tags else "",
                 },
-            )
+            ))
             results.append({
-                "edge_id": edge_id,
+                "edge_id": None,  # filled in after the bulk insert below
                 "dst_id": rid,
                 "weight": weight,
                 "distance": dist,
                 "tag_overlap": overlap,
             })
+        for res, edge_id in zip(results, self.db.create_edges_bulk(pending)):
+            res["edge_id"] = edge_id
         return results
     
     
     def autolink_recent(self, limit: int = 10, top_k: int = 5, max_distance: float = 0.6, require_tag_overlap: bool = True, min_tag_overlap: int = 1, close_override_distance: float = 0.3, min_cosine: float = 0.55, require_mutual: bool = False, *, user_id: Optional[str] = None, voice_profile_id: Optional[str] = None) -> List[Dict]:
         """Autolink the most recent ideas, optionally scoped to a user and voice profile."""
-        ideas = self.db.list_idea_nodes(limit=limit, user_id=user_id, voice_profile_id=voice_profile_id)
+        # Materialized first: autolink writes while we'd otherwise still be stepping this cursor
+        ideas = list(self.db.iter_idea_rows(("node_id",), limit=limit, user_id=user_id, voice_profile_id=voice_profile_id))
         out: List[Dict] = []
         for row in ideas:
             nid = row["node_id"]
@@ -218,15 +241,18 @@ class GraphAgent:
     
     
     def cluster_ideas(self, k: int = 3) -> Dict:
-        data = self.chroma.get_ideas(include=["embeddings", "metadatas", "documents", "ids"])
+        data = self.chroma.get_ideas(include=["embeddings", "metadatas", "documents", "ids"], as_numpy=True)
         ids = data.get("ids") or []
-        embs = data.get("embeddings") or []
+        # float32 (n, d) matrix, handed to kmeans_np without a copy
+        embs = data.get("embeddings")
         metas = data.get("metadatas") or []
         docs = data.get("documents") or []
-        if not ids or not embs:
+        if not ids or embs is None or len(embs) == 0:
             return {"clusters": []}
         
-        labels, centroids = kmeans(embs, k=k, max_iter=25, seed=42)
+        # Centroids aren't used here, so skip converting them to lists
+        labels, _ = kmeans_np(embs, k=k, max_iter=25, seed=42)
+        labels = labels.tolist()
         clusters: Dict[int, Dict] = {i: {"ids": [], "titles": [], "tags": []} for i in range(max(labels) + 1)}
         
         for i, nid in enumerate(ids):
@@ -241,7 +267,8 @@ class GraphAgent:
                 clusters[label]["tags"].extend([t.strip() for t in tags.split(",") if t.strip()])
         
         results = []
-        
+        member_edges: List[Tuple[str, str, str, float, Dict]] = []
+
         for cid, info in clusters.items():
             label_tokens = top_tokens(info["titles"], n=3)
             tag_counts = {}
@@ -251,7 +278,7 @@ class GraphAgent:
 
             cluster_node_id = f"cluster:{k}:{cid}"
             for nid in info["ids"]:
-                self.db.create_edge(src_id=cluster_node_id, dst_id=nid, edge_type="cluster_member", weight=1.0, metadata={"label": label})
+                member_edges.append((cluster_node_id, nid, "cluster_member", 1.0, {"label": label}))
             
             results.append({
                 "cluster_id": cluster_node_id,
@@ -261,4 +288,5 @@ class GraphAgent:
                 "top_tags": sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:3],
             })
             
+        self.db.create_edges_bulk(member_edges)
         return {"k": k, "clusters": results}
\ No newline at end of file
@@ -6,7 +6,7 @@ import hashlib
 from core.database.sqlite_manager import SQLiteManager
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
-from core.models.retrievers import SemanticRetriever
+from core.models.retrievers import SemanticRetriever, get_retriever
 from core.models.generators import generate_ideas
 
 
@@ -23,7 +23,7 @@ class IdeaGeneratorAgent:
         self.db = SQLiteManager(db_path)
         self.chroma = chroma or ChromaManager()
         self.embedder = embedder or EmbeddingModel()
-        self.retriever = retriever or SemanticRetriever(chroma=self.chroma, embedder=self.embedder)
+        self.retriever = retriever or get_retriever(chroma=self.chroma, embedder=self.embedder)
 
     def ensure_user_id(self, username: str) -> str:
         conn = self.db.connect()
@@ -126,7 +126,9 @@ class IdeaGeneratorAgent:
             i_tags = idea.get("tags") or []
             
             embedding = self.embedder.embed_text(content)
-            node_id = self.db.create_idea_node(
+            # Upsert on (user_id, request_key): a concurrent identical request that won the
+            # race since the lookup above yields its node instead of a duplicate row
+            node_id, created = self.db.upsert_idea_node(
                 user_id = user_id,
                 title = title,
                 content = content,
@@ -137,6 +139,15 @@ class IdeaGeneratorAgent:
                 request_key = request_key,
                 metadata={"prompt": prompt, "generator": "local", "rank": idx + 1}
             )
+            if not created:
+                return {
+                    "user_id": user_id,
+                    "username": username,
+                    "voice_profile_id": vp.get("profile_id"),
+                    "created_idea_ids": [node_id],
+                    "count": 1,
+                    "deduped": True,
+                }
             
             
             
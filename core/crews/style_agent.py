@@ -4,7 +4,7 @@ from typing import Dict, List, Tuple
 from core.database.sqlite_manager import SQLiteManager
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
-from core.models.metrics import compute_text_metrics  # alias to compute_style_metrics
+from core.models.metrics import compute_text_metrics_iter
 
 
 class StyleLearnerAgent:
@@ -28,7 +28,7 @@ class StyleLearnerAgent:
             return row["user_id"]
         return self.db.create_user(username)
 
-    def _collect_samples(self, max_files: int = 50, max_chars_per_file: int = 4000) -> Tuple[str, List[str]]:
+    def _collect_samples(self, max_files: int = 50, max_chars_per_file: int = 4000) -> Tuple[List[str], List[str]]:
         texts: List[str] = []
         file_ids: List[str] = []
         # Preferred path: read any previously ingested writing samples from SQLite
@@ -36,13 +36,10 @@ class StyleLearnerAgent:
         if rows:
             for r in rows[:max_files]:
                 fid = r.get("file_id") or r.get("filepath") or ""
-                combined = ""
                 try:
-                    chunks = self.db.get_chunks_for_file(r.get("file_id", ""))
+                    combined = "".join(c or "" for c in self.db.iter_chunk_contents(r.get("file_id", "")))
                 except Exception:
-                    chunks = []
-                if chunks:
-                    combined = "".join(c.get("content", "") for c in chunks)
+                    combined = ""
                 if not combined:
                     rel = r.get("filepath", "")
                     fpath = rel if os.path.isabs(rel) else os.path.join(os.getcwd(), rel)
@@ -56,7 +53,7 @@ class StyleLearnerAgent:
                     continue
                 texts.append(combined[:max_chars_per_file])
                 file_ids.append(fid)
-            return ("\n\n".join(texts), file_ids)
+            return (texts, file_ids)
 
         # Fallback: read directly from the repo's data/writing_samples when DB is empty (first-run environments)
         samples_dir = os.path.join(os.getcwd(), "data", "writing_samples")
@@ -80,7 +77,7 @@ class StyleLearnerAgent:
                 rel = os.path.relpath(fpath).replace("\\", "/")
                 file_ids.append(rel)
                 added += 1
-        return ("\n\n".join(texts), file_ids)
+        return (texts, file_ids)
 
     def _build_embeddings(self, text: str) -> List[float]:
         return self.embedder.embed_text(text or "")
@@ -93,11 +90,12 @@ class StyleLearnerAgent:
         max_chars_per_file: int = 4000
     ) -> Dict:
         user_id = self._ensure_user_id(username)
-        text, file_ids = self._collect_samples(max_files=max_files, max_chars_per_file=max_chars_per_file)
-        if not text.strip():
+        texts, file_ids = self._collect_samples(max_files=max_files, max_chars_per_file=max_chars_per_file)
+        if not any(t.strip() for t in texts):
             raise ValueError("No valid writing samples found for learning voice profile.")
-        metrics = compute_text_metrics(text)
-        embedding = self._build_embeddings(text)
+        # Metrics are streamed per sample; only the profile embedding needs the combined text
+        metrics = compute_text_metrics_iter(texts)
+        embedding = self._build_embeddings("\n\n".join(texts))
         profile_id = self.db.create_voice_profile(
             user_id=user_id,
             profile_name=profile_name,
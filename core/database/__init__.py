@@ -1,7 +1,25 @@
+import sys
+
+# Prefer a current SQLite amalgamation when pysqlite3-binary is installed (Chroma needs >= 3.35,
+# and newer builds plan and scan noticeably faster). Must run before anything imports sqlite3.
 try:
-    from .chroma_manager import ChromaManager  # optional; may require chromadb
+    import pysqlite3  # type: ignore
+    sys.modules["sqlite3"] = pysqlite3
 except Exception:
-    ChromaManager = None  # type: ignore
+    pass
+
 from .sqlite_manager import SQLiteManager
 
+
+def __getattr__(name):
+    # ChromaManager is resolved on first use so SQLite-only callers (CLIs, tools) don't import chromadb
+    if name == "ChromaManager":
+        try:
+            from .chroma_manager import ChromaManager  # optional; may require chromadb
+        except Exception:
+            ChromaManager = None  # type: ignore
+        globals()["ChromaManager"] = ChromaManager
+        return ChromaManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = ["SQLiteManager"]
\ No newline at end of file
@@ -1,120 +1,243 @@
 from __future__ import annotations
 import os
+import functools
 import json
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 import logging
 import chromadb
+import numpy as np
+
+try:
+    import orjson  # optional; much faster than stdlib json for metadata encoding
+except Exception:
+    orjson = None  # type: ignore
+
+_ALLOWED_INCLUDE = frozenset({"documents", "embeddings", "metadatas", "distances", "uris", "data"})
+_DEFAULT_INCLUDE = ("documents", "metadatas")
+_REINIT_INTERVAL_S = 1.0
+# Below this many ideas, clear_ideas deletes by id instead of dropping the collection
+_CLEAR_BY_IDS_MAX = 1000
+# Errors that mean our collection handle went stale (deleted/recreated collection, dangling UUID).
+# ValueError covers older chromadb releases that raise it for a missing collection id.
+_RECOVERABLE_ERRORS = tuple(
+    getattr(chromadb.errors, n)
+    for n in ("InvalidCollectionException", "NotFoundError", "InvalidUUIDError")
+    if hasattr(chromadb.errors, n)
+) + (ValueError,)
+_COLLECTION_DESCS = {
+    "chunks": "Doc chunk embeddings",
+    "voice_profiles": "Voice embeddings",
+    "ideas": "Idea embeddings",
+}
+
+
+# One PersistentClient per persist directory for the whole process; opening a client reloads
+# SQLite and the HNSW segments, so managers constructed per request share it instead.
+_CLIENTS: Dict[str, "chromadb.ClientAPI"] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(path: str, fresh: bool = False):
+    key = os.path.abspath(path)
+    with _CLIENTS_LOCK:
+        client = None if fresh else _CLIENTS.get(key)
+        if client is None:
+            client = chromadb.PersistentClient(path=path)
+            _CLIENTS[key] = client
+        return client
+
+
+# Completed writes per persist directory in this process. FlatRetriever compares it to notice
+# changes that leave a collection's count unchanged (e.g. clear_ideas followed by re-adding).
+_WRITES: Dict[str, int] = {}
+
+
+def _writes(method):
+    """Mark a ChromaManager method as mutating: bump the directory's write count after it runs."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _WRITES[self._writes_key] = _WRITES.get(self._writes_key, 0) + 1
+    return wrapper
+
+
+def _json_dumps(v) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(v, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(v, ensure_ascii=False)
+
+
+def _prepare_metadata(metadata: Dict) -> Dict:
+    out: Dict = {}
+    for k, v in (metadata or {}).items():
+        # Handle dicts (metrics flattened, others JSON-encoded)
+        if isinstance(v, dict):
+            if k == "metrics":
+                for mk, mv in v.items():
+                    key = f"metrics_{mk}"
+                    if isinstance(mv, np.generic):
+                        mv = mv.item()
+                    out[key] = mv if isinstance(mv, (str, int, float, bool)) or mv is None else str(mv)
+            else:
+                out[k] = _json_dumps(v)
+            continue
+
+        # Convert lists/tuples/sets to a safe string form (chroma expects primitive values)
+        if isinstance(v, (list, tuple, set)):
+            # If it's a simple list of primitives, join as comma-separated string
+            if all(isinstance(x, (str, int, float, bool)) or x is None for x in v):
+                out[k] = ",".join(["" if x is None else str(x) for x in v])
+            else:
+                # Fallback: JSON-encode complex lists
+                out[k] = _json_dumps(list(v))
+            continue
+
+        # Pass through primitive values; convert others to string
+        if isinstance(v, (str, int, float, bool)) or v is None:
+            out[k] = v
+        else:
+            out[k] = str(v)
+    return out
+
+
+def _safe_collection(name: str):
+    # Minimal safe stub that mirrors the Chroma collection interface used here
+    class _Safe:
+        # Marks the stub so callers can tell it from a live (possibly empty) collection
+        is_safe_stub = True
+
+        def add(self, *args, **kwargs):
+            self._log(name, 'add called on safe collection; no-op')
+        def query(self, *args, **kwargs):
+            self._log(name, 'query called on safe collection; returning empty result')
+            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        def get(self, *args, **kwargs):
+            self._log(name, 'get called on safe collection; returning empty result')
+            return {"ids": [], "documents": [], "metadatas": [], "embeddings": [], "distances": []}
+        def count(self, *args, **kwargs):
+            return 0
+        def delete(self, *args, **kwargs):
+            self._log(name, 'delete called on safe collection; no-op')
+        def _log(self, n, m):
+            try:
+                self_logger = logging.getLogger(__name__)
+                self_logger.warning("[chroma-safe] %s: %s", n, m)
+            except Exception:
+                pass
+    return _Safe()
 
 
 class ChromaManager:
     def __init__(self, persist_directory: str = "storage/chromadb"):
         self.persist_directory = persist_directory
+        self._writes_key = os.path.abspath(persist_directory)
         os.makedirs(self.persist_directory, exist_ok=True)
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.client = _get_client(persist_directory)
         self.logger = logging.getLogger(__name__)
         if not self.logger.handlers:
             logging.basicConfig(level=logging.INFO)
+        self._client_lock = threading.Lock()
+        self._last_reinit_ts = float("-inf")
         self._init_collections()
 
     def _init_collections(self):
         """Initialize or recreate collections. Be resilient to corrupted/missing collections.
 
-        If a collection operation fails (for example Chromadb complains a stored UUID does not exist),
+        Each collection goes through _get_or_create_one's recovery ladder, and a collection that
+        still fails gets a safe no-op wrapper so calls don't raise and the app can continue.
+        Opened one after another: on the shared embedded client a thread pool was slower.
+        """
+        created = {name: self._get_or_create_one(name) for name in _COLLECTION_DESCS}
+
+        # Attach to self ensuring keys exist
+        self.chunks = created.get("chunks") or _safe_collection("chunks")
+        self.voice = created.get("voice_profiles") or _safe_collection("voice_profiles")
+        self.ideas = created.get("ideas") or _safe_collection("ideas")
+
+    def _get_or_create_one(self, name: str):
+        """Open one collection, recovering from a broken one where possible.
+
+        If the operation fails (for example Chromadb complains a stored UUID does not exist),
         attempt to delete the named collection and recreate it. If that also fails, recreate the
-        client and retry. As a last resort, attach a safe no-op collection wrapper so calls don't
-        raise and the app can continue.
+        client and retry. As a last resort, return a safe no-op collection wrapper.
         """
-        def safe_collection(name: str):
-            # Minimal safe stub that mirrors the Chroma collection interface used here
-            class _Safe:
-                def add(self, *args, **kwargs):
-                    self._log(name, 'add called on safe collection; no-op')
-                def query(self, *args, **kwargs):
-                    self._log(name, 'query called on safe collection; returning empty result')
-                    return {"ids": [], "documents": [], "metadatas": [], "distances": []}
-                def get(self, *args, **kwargs):
-                    self._log(name, 'get called on safe collection; returning empty result')
-                    return {"ids": [], "documents": [], "metadatas": [], "embeddings": [], "distances": []}
-                def count(self, *args, **kwargs):
-                    return 0
-                def delete(self, *args, **kwargs):
-                    self._log(name, 'delete called on safe collection; no-op')
-                def _log(self, n, m):
-                    try:
-                        self_logger = logging.getLogger(__name__)
-                        self_logger.warning("[chroma-safe] %s: %s", n, m)
-                    except Exception:
-                        pass
-            return _Safe()
-
-        names = ["chunks", "voice_profiles", "ideas"]
-        created = {}
-        for name in names:
+        try:
+            return self.client.get_or_create_collection(name, metadata={"desc": _COLLECTION_DESCS[name]})
+        except Exception as e:
+            # Attempt to recover: delete the potentially-broken collection and recreate
+            self.logger.warning("[chroma] _init_collections failed for %s: %s; attempting delete+recreate", name, e)
+        try:
+            # try delete by name (chroma will ignore unknown names but may delete existing)
             try:
-                if name == "chunks":
-                    created[name] = self.client.get_or_create_collection("chunks", metadata={"desc": "Doc chunk embeddings"})
-                elif name == "voice_profiles":
-                    created[name] = self.client.get_or_create_collection("voice_profiles", metadata={"desc": "Voice embeddings"})
-                elif name == "ideas":
-                    created[name] = self.client.get_or_create_collection("ideas", metadata={"desc": "Idea embeddings"})
-            except Exception as e:
-                # Attempt to recover: delete the potentially-broken collection and recreate
-                self.logger.warning("[chroma] _init_collections failed for %s: %s; attempting delete+recreate", name, e)
-                try:
-                    # try delete by name (chroma will ignore unknown names but may delete existing)
-                    try:
-                        self.client.delete_collection(name)
-                    except Exception:
-                        # best-effort: ignore
-                        pass
-                    # recreate
-                    created[name] = self.client.get_or_create_collection(name, metadata={"desc": f"{name} collection"})
-                except Exception as e2:
-                    self.logger.error("[chroma] failed to recreate collection %s: %s; attempting client recreate", name, e2)
-                    try:
-                        # Recreate the client and retry create
-                        self.client = chromadb.PersistentClient(path=self.persist_directory)
-                        created[name] = self.client.get_or_create_collection(name, metadata={"desc": f"{name} collection"})
-                    except Exception as e3:
-                        self.logger.error("[chroma] failed after client recreate for %s: %s; falling back to safe collection", name, e3)
-                        created[name] = safe_collection(name)
+                self.client.delete_collection(name)
+            except Exception:
+                # best-effort: ignore
+                pass
+            # recreate
+            return self.client.get_or_create_collection(name, metadata={"desc": f"{name} collection"})
+        except Exception as e2:
+            self.logger.error("[chroma] failed to recreate collection %s: %s; attempting client recreate", name, e2)
+        try:
+            # Recreate the client and retry create; serialized so concurrent failures share one client
+            with self._client_lock:
+                self.client = _get_client(self.persist_directory, fresh=True)
+                return self.client.get_or_create_collection(name, metadata={"desc": f"{name} collection"})
+        except Exception as e3:
+            self.logger.error("[chroma] failed after client recreate for %s: %s; falling back to safe collection", name, e3)
+            return _safe_collection(name)
 
-        # Attach to self ensuring keys exist
-        self.chunks = created.get("chunks") or safe_collection("chunks")
-        self.voice = created.get("voice_profiles") or safe_collection("voice_profiles")
-        self.ideas = created.get("ideas") or safe_collection("ideas")
+    @property
+    def write_count(self) -> int:
+        """Writes made through any manager on this directory in this process (not other processes)."""
+        return _WRITES.get(self._writes_key, 0)
+
+    @_writes
+    def _reinit_collections(self) -> None:
+        """Re-run _init_collections at most once per _REINIT_INTERVAL_S across threads."""
+        with self._client_lock:
+            now = time.monotonic()
+            if now - self._last_reinit_ts < _REINIT_INTERVAL_S:
+                return
+            self._last_reinit_ts = now
+        self._init_collections()
+
+    def _query_with_recovery(self, what: str, run, empty: Dict) -> Dict:
+        """Run a collection query, re-initializing only for missing-collection/UUID errors.
+
+        Anything else (e.g. a malformed where filter) is a caller error: log it and return the
+        empty result without paying for a full collection reinit.
+        """
+        try:
+            return run()
+        except _RECOVERABLE_ERRORS as e:
+            # Try to recover from missing/deleted collection by re-initializing
+            self.logger.warning("[chroma] %s error: %s; attempting to re-init collections", what, e)
+        except Exception as e:
+            self.logger.error("[chroma] %s error: %s", what, e)
+            return empty
+        try:
+            self._reinit_collections()
+            return run()
+        except Exception as e2:
+            self.logger.error("[chroma] %s failed after retry: %s", what, e2)
+            return empty
 
     def _prepare_metadata(self, metadata: Dict) -> Dict:
-        out: Dict = {}
-        for k, v in (metadata or {}).items():
-            # Handle dicts (metrics flattened, others JSON-encoded)
-            if isinstance(v, dict):
-                if k == "metrics":
-                    for mk, mv in v.items():
-                        key = f"metrics_{mk}"
-                        out[key] = mv if isinstance(mv, (str, int, float, bool)) or mv is None else str(mv)
-                else:
-                    out[k] = json.dumps(v, ensure_ascii=False)
-                continue
-
-            # Convert lists/tuples/sets to a safe string form (chroma expects primitive values)
-            if isinstance(v, (list, tuple, set)):
-                # If it's a simple list of primitives, join as comma-separated string
-                if all(isinstance(x, (str, int, float, bool)) or x is None for x in v):
-                    out[k] = ",".join(["" if x is None else str(x) for x in v])
-                else:
-                    # Fallback: JSON-encode complex lists
-                    out[k] = json.dumps(list(v), ensure_ascii=False)
-                continue
-
-            # Pass through primitive values; convert others to string
-            if isinstance(v, (str, int, float, bool)) or v is None:
-                out[k] = v
-            else:
-                out[k] = str(v)
-        return out
+        return _prepare_metadata(metadata)
+
+    def _prepare_metadatas(self, metadatas: List[Dict]) -> List[Dict]:
+        """Prepare many metadata dicts in-process (a process pool costs more than it saves here)."""
+        return [_prepare_metadata(m) for m in metadatas]
 
     # chunks
+    @_writes
     def add_chunk(self, chunk_id: str, embedding: List[float], content: str, metadata: Dict):
         self.chunks.add(
             ids=[chunk_id],
@@ -123,29 +246,35 @@ class ChromaManager:
             metadatas=[self._prepare_metadata(metadata)],
         )
 
-    def query_chunks(self, query_embedding: List[float], n_results: int = 5, where: Optional[Dict] = None) -> Dict:
+    @_writes
+    def add_chunks_bulk(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict]) -> None:
+        """Add many chunks with as few collection.add calls as the client's batch limit allows."""
+        if not ids:
+            return
+        mds = self._prepare_metadatas(metadatas)
         try:
-            return self.chunks.query(
+            step = int(self.client.get_max_batch_size())
+        except Exception:
+            step = len(ids)
+        for i in range(0, len(ids), max(1, step)):
+            self.chunks.add(
+                ids=ids[i:i + step],
+                embeddings=embeddings[i:i + step],
+                documents=documents[i:i + step],
+                metadatas=mds[i:i + step],
+            )
+
+    def query_chunks(self, query_embedding: List[float], n_results: int = 5, where: Optional[Dict] = None) -> Dict:
+        return self._query_with_recovery(
+            "query_chunks",
+            lambda: self.chunks.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
                 where=where if where else None,
                 include=["metadatas", "documents", "distances"],
-            )
-        except Exception as e:
-            # Try to recover from missing/deleted collection by re-initializing
-            self.logger.warning("[chroma] query_chunks error: %s; attempting to re-init collections", e)
-            try:
-                self._init_collections()
-                return self.chunks.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results,
-                    where=where if where else None,
-                    include=["metadatas", "documents", "distances"],
-                )
-            except Exception as e2:
-                self.logger.error("[chroma] query_chunks failed after retry: %s", e2)
-                return {"metadatas": [], "documents": [], "distances": []}
-
+            ),
+            {"metadatas": [], "documents": [], "distances": []},
+        )
     def count_chunks(self) -> int:
         try:
             return self.chunks.count()
@@ -153,6 +282,7 @@ class ChromaManager:
             return 0
 
     # voice profiles
+    @_writes
     def add_voice_profile(self, profile_id: str, embedding: List[float], metadata: Dict):
         md = self._prepare_metadata(metadata)
         self.voice.add(
@@ -163,28 +293,17 @@ class ChromaManager:
         )
 
     def query_voice(self, query_embedding: List[float], n_results: int = 3, where: Optional[Dict] = None) -> Dict:
-        try:
-            return self.voice.query(
+        return self._query_with_recovery(
+            "query_voice",
+            lambda: self.voice.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
                 where=where if where else None,
                 include=["metadatas", "documents", "distances"],
-            )
-        except Exception as e:
-            self.logger.warning("[chroma] query_voice error: %s; attempting to re-init collections", e)
-            try:
-                self._init_collections()
-                return self.voice.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results,
-                    where=where if where else None,
-                    include=["metadatas", "documents", "distances"],
-                )
-            except Exception as e2:
-                self.logger.error("[chroma] query_voice failed after retry: %s", e2)
-                return {"metadatas": [], "documents": [], "distances": []}
-
-    # ideas
+            ),
+            {"metadatas": [], "documents": [], "distances": []},
+        )
+    @_writes
     def add_idea(self, node_id: str, embedding: List[float], content: str, metadata: Dict):
         try:
             self.ideas.add(
@@ -197,7 +316,7 @@ class ChromaManager:
             # Recover from collection-not-found by re-initializing once
             self.logger.warning("[chroma] add_idea error: %s; attempting to re-init collections", e)
             try:
-                self._init_collections()
+                self._reinit_collections()
                 self.ideas.add(
                     ids=[node_id],
                     embeddings=[embedding],
@@ -208,58 +327,79 @@ class ChromaManager:
                 self.logger.error("[chroma] add_idea failed after retry: %s", e2)
 
     def query_ideas(self, query_embedding: List[float], n_results: int = 5, where: Optional[Dict] = None) -> Dict:
-        try:
-            return self.ideas.query(
+        return self._query_with_recovery(
+            "query_ideas",
+            lambda: self.ideas.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
                 where=where if where else None,
                 include=["metadatas", "documents", "distances"],
-            )
-        except Exception as e:
-            self.logger.warning("[chroma] query_ideas error: %s; attempting to re-init collections", e)
-            try:
-                self._init_collections()
-                return self.ideas.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results,
-                    where=where if where else None,
-                    include=["metadatas", "documents", "distances"],
-                )
-            except Exception as e2:
-                self.logger.error("[chroma] query_ideas failed after retry: %s", e2)
-                return {"ids": [], "documents": [], "metadatas": [], "distances": []}
-
-    def get_ideas(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict:
-        allowed = {"documents", "embeddings", "metadatas", "distances", "uris", "data"}
-        inc = list(dict.fromkeys([i for i in (include or ["documents", "metadatas"]) if i in allowed]))
+            ),
+            {"ids": [], "documents": [], "metadatas": [], "distances": []},
+        )
+    def get_ideas(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None, as_numpy: bool = False) -> Dict:
+        """Fetch idea records. With as_numpy=True embeddings come back as a float32 ndarray."""
+        inc = list(_DEFAULT_INCLUDE if not include else (i for i in include if i in _ALLOWED_INCLUDE))
         try:
             resp = self.ideas.get(ids=ids, include=inc) if ids else self.ideas.get(include=inc)
         except Exception as e:
             # Attempt to recover once
             self.logger.warning("[chroma] get_ideas error: %s; attempting to re-init collections", e)
             try:
-                self._init_collections()
+                self._reinit_collections()
                 resp = self.ideas.get(ids=ids, include=inc) if ids else self.ideas.get(include=inc)
             except Exception as e2:
                 self.logger.error("[chroma] get_ideas failed after retry: %s", e2)
                 resp = {"ids": [], "documents": [], "metadatas": [], "embeddings": [], "distances": []}
-        # normalize embeddings to plain Python lists to avoid NumPy truthiness issues
-        if "embeddings" in resp and resp["embeddings"] is not None:
-            embs = resp["embeddings"]
-            if hasattr(embs, "tolist"):
-                resp["embeddings"] = embs.tolist()
-            elif isinstance(embs, list):
-                resp["embeddings"] = [e.tolist() if hasattr(e, "tolist") else list(e) if not isinstance(e, list) else e for e in embs]
+        # normalize embeddings in one C-level conversion (plain lists avoid NumPy truthiness issues)
+        embs = resp.get("embeddings")
+        if embs is not None:
+            arr = np.asarray(embs, dtype=np.float32)
+            resp["embeddings"] = arr if as_numpy else arr.tolist()
         return resp
 
+    def get_ideas_arrays(self, ids: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray, List[Dict]]:
+        """Return (ids, embeddings, metadatas) with embeddings as an (N, D) float32 matrix.
+
+        Lets similarity code use `emb @ query` instead of iterating per-row Python lists.
+        """
+        resp = self.get_ideas(ids=ids, include=["embeddings", "metadatas"], as_numpy=True)
+        emb = resp.get("embeddings")
+        if emb is None or emb.size == 0:
+            emb = np.zeros((0, 0), dtype=np.float32)
+        return list(resp.get("ids") or []), emb, list(resp.get("metadatas") or [])
+
     def count_ideas(self) -> int:
         try:
             return self.ideas.count()
         except Exception:
             return 0
 
+    @_writes
     def clear_ideas(self) -> None:
-        """Remove all idea vectors. Recreate the collection if needed."""
+        """Remove all idea vectors. Recreate the collection if needed.
+
+        Empty collections are left alone; small ones are emptied by id so the HNSW index is not
+        torn down and rebuilt. Only large collections are dropped and recreated.
+        """
+        # Only a live collection that answers count() may short-circuit; the stub (or a count
+        # error) means the collection is broken and must go through drop + recreate below
+        n: Optional[int] = None
+        if not getattr(self.ideas, "is_safe_stub", False):
+            try:
+                n = int(self.ideas.count())
+            except Exception:
+                n = None
+        if n == 0:
+            return
+        if n is not None and n < _CLEAR_BY_IDS_MAX:
+            try:
+                ids = self.ideas.get(include=[]).get("ids") or []
+                if ids:
+                    self.ideas.delete(ids=ids)
+                return
+            except Exception:
+                pass
         try:
             # Fast path: drop the collection entirely
             self.client.delete_collection("ideas")
@@ -275,6 +415,7 @@ class ChromaManager:
         except Exception:
             pass
 
+    @_writes
     def delete_ideas_for_profile(self, voice_profile_id: str) -> None:
         """Delete idea vectors for a specific voice_profile_id."""
         if not voice_profile_id:
@@ -284,7 +425,7 @@ class ChromaManager:
         except Exception as e:
             self.logger.warning("[chroma] delete_ideas_for_profile error: %s; attempting re-init", e)
             try:
-                self._init_collections()
+                self._reinit_collections()
                 self.ideas.delete(where={"voice_profile_id": str(voice_profile_id)})
             except Exception as e2:
                 self.logger.error("[chroma] delete_ideas_for_profile failed after retry: %s", e2)
\ No newline at end of file
@@ -1,59 +1,543 @@
 from __future__ import annotations
 import os
 import json
+import queue
 import sqlite3
 import threading
-import uuid
+import time
+import secrets
 import random
 import re
+from concurrent.futures import Future
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson  # optional; several times faster than stdlib json for small dicts
+except Exception:
+    orjson = None  # type: ignore
+
+# SQL is kept in module constants so each statement text is built once and hits the
+# connection's prepared-statement cache on every call.
+_SQL_INSERT_USER = """
+    INSERT INTO users (user_id, username, created_at, updated_at, preferences, writing_style_profile_id, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_USER_BY_NAME = "SELECT * FROM users WHERE username = ?"
+_SQL_USER_BY_ID = "SELECT * FROM users WHERE user_id = ?"
+_SQL_INSERT_SOURCE_FILE = """
+    INSERT INTO source_files
+    (file_id, filename, filepath, file_type, file_size, uploaded_at, uploaded_by,
+     content_hash, tags, category, metadata, processing_status, processed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_SOURCE_FILE_BY_ID = "SELECT * FROM source_files WHERE file_id = ?"
+_SQL_UPDATE_SOURCE_FILE_STATUS = """
+    UPDATE source_files
+    SET processing_status = ?, processed_at = ?
+    WHERE file_id = ?
+"""
+_SQL_DELETE_SOURCE_FILE = "DELETE FROM source_files WHERE file_id = ?"
+_SQL_SOURCE_FILES_BY_CATEGORY = "SELECT * FROM source_files WHERE category = ? ORDER BY uploaded_at DESC"
+_SQL_SOURCE_FILES_ALL = "SELECT * FROM source_files ORDER BY uploaded_at DESC"
+# Ingest dedup; the OR is answered from ix_source_files_hash and ix_source_files_path
+_SQL_SOURCE_FILE_EXISTS = "SELECT 1 FROM source_files WHERE content_hash = ? OR filepath = ? LIMIT 1"
+_SQL_INSERT_DOC_CHUNK = """
+    INSERT INTO doc_chunks
+    (chunk_id, source_file_id, chunk_index, content, content_length, start_char, end_char,
+     embedding_id, chunk_type, created_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_CHUNKS_FOR_FILE = "SELECT * FROM doc_chunks WHERE source_file_id = ? ORDER BY chunk_index ASC"
+_SQL_CHUNK_CONTENTS_FOR_FILE = "SELECT content FROM doc_chunks WHERE source_file_id = ? ORDER BY chunk_index ASC"
+# Tokens are '<base><4 digits>': one range scan on uq_voice_auth_token finds every taken suffix
+_SQL_VOICE_TOKENS_TAKEN = "SELECT auth_token FROM voice_profiles WHERE auth_token BETWEEN ? AND ? AND length(auth_token) = ?"
+_SQL_INSERT_VOICE_PROFILE = """
+    INSERT INTO voice_profiles (profile_id, user_id, profile_name, is_active, analysis_metrics, source_file_ids, auth_token, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_DEACTIVATE_OTHER_VOICES = "UPDATE voice_profiles SET is_active = 0 WHERE user_id = ? AND profile_id != ?"
+_SQL_ACTIVE_VOICE_PROFILE = "SELECT * FROM voice_profiles WHERE user_id = ? AND is_active = 1 ORDER BY updated_at DESC LIMIT 1"
+_SQL_VOICE_BY_TOKEN = "SELECT * FROM voice_profiles WHERE auth_token = ? LIMIT 1"
+_SQL_VOICE_OWNER = "SELECT user_id FROM voice_profiles WHERE profile_id = ?"
+_SQL_SET_ACTIVE_VOICE = "UPDATE voice_profiles SET is_active = CASE WHEN profile_id = ? THEN 1 ELSE 0 END WHERE user_id = ?"
+_SQL_VOICE_BY_ID = "SELECT * FROM voice_profiles WHERE profile_id = ?"
+_SQL_VOICES_FOR_USER = "SELECT * FROM voice_profiles WHERE user_id = ? ORDER BY updated_at DESC"
+_SQL_DELETE_IDEAS_FOR_PROFILE = "DELETE FROM idea_nodes WHERE user_id = ? AND voice_profile_id = ?"
+_SQL_INSERT_IDEA = """
+    INSERT INTO idea_nodes (node_id, user_id, title, content, tags, voice_profile_id, source_chunk_ids, source_file_ids, request_key, metadata, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_IDEA_BY_ID = "SELECT * FROM idea_nodes WHERE node_id = ?"
+_SQL_IDEA_BY_REQUEST_KEY = "SELECT * FROM idea_nodes WHERE user_id = ? AND request_key = ? ORDER BY created_at DESC LIMIT 1"
+_SQL_DELETE_ALL_IDEAS = "DELETE FROM idea_nodes"
+# Normalized idea -> tag / source chunk / source file links (the comma-joined columns stay for readers)
+_SQL_INSERT_IDEA_TAG = "INSERT OR IGNORE INTO idea_tags (node_id, tag) VALUES (?, ?)"
+_SQL_INSERT_IDEA_SOURCE_CHUNK = "INSERT OR IGNORE INTO idea_source_chunks (node_id, chunk_id, ord) VALUES (?, ?, ?)"
+_SQL_INSERT_IDEA_SOURCE_FILE = "INSERT OR IGNORE INTO idea_source_files (node_id, file_id) VALUES (?, ?)"
+_IDEA_LINK_TABLES = ("idea_tags", "idea_source_chunks", "idea_source_files")
+_SQL_DELETE_ALL_IDEA_LINKS = tuple(f"DELETE FROM {t}" for t in _IDEA_LINK_TABLES)
+# Deleting an idea removes its edges (either endpoint) and link rows in the same statement.
+# A trigger rather than FOREIGN KEY ... ON DELETE CASCADE: GraphAgent's cluster edges use
+# synthetic "cluster:..." src ids that are not idea_nodes rows, so an FK would reject them.
+_SQL_IDEA_DELETE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_idea_nodes_cascade AFTER DELETE ON idea_nodes
+    BEGIN
+        DELETE FROM edges WHERE src_id = OLD.node_id;
+        DELETE FROM edges WHERE dst_id = OLD.node_id;
+        DELETE FROM idea_tags WHERE node_id = OLD.node_id;
+        DELETE FROM idea_source_chunks WHERE node_id = OLD.node_id;
+        DELETE FROM idea_source_files WHERE node_id = OLD.node_id;
+    END
+"""
+_SQL_IDEA_IDS_BY_TAG = "SELECT node_id FROM idea_tags WHERE tag = ?"
+_SQL_TAGS_FOR_IDEA = "SELECT tag FROM idea_tags WHERE node_id = ?"
+_SQL_SOURCE_CHUNKS_FOR_IDEA = "SELECT chunk_id FROM idea_source_chunks WHERE node_id = ? ORDER BY ord"
+_SQL_SOURCE_FILES_FOR_IDEA = "SELECT file_id FROM idea_source_files WHERE node_id = ?"
+# Non-unique idea_nodes indexes; bulk_ingest_ideas drops and rebuilds these around big batches.
+# uq_idea_request_key is never dropped since it enforces idempotency.
+_IDEA_SECONDARY_INDEXES = {
+    "ix_idea_user_created": "CREATE INDEX IF NOT EXISTS ix_idea_user_created ON idea_nodes(user_id, created_at DESC)",
+    # list_idea_nodes with both filters / unfiltered
+    "ix_idea_user_profile_created": "CREATE INDEX IF NOT EXISTS ix_idea_user_profile_created ON idea_nodes(user_id, voice_profile_id, created_at DESC)",
+    "ix_idea_created": "CREATE INDEX IF NOT EXISTS ix_idea_created ON idea_nodes(created_at DESC)",
+}
+_SQL_DROP_IDEA_SECONDARY_INDEXES = tuple(f"DROP INDEX IF EXISTS {name}" for name in _IDEA_SECONDARY_INDEXES)
+# Below this many rows, maintaining the indexes row by row beats rebuilding them
+_BULK_REINDEX_MIN = 5000
+# Table-valued pragma takes the table name as a bound parameter, so one statement text
+# serves every table instead of an f-string per call
+_SQL_TABLE_COLUMNS = "SELECT name FROM pragma_table_info(?)"
+_SQL_INSERT_EDGE = """
+    INSERT INTO edges (edge_id, src_id, dst_id, edge_type, weight, metadata, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_EDGE_EXISTS = "SELECT 1 FROM edges WHERE src_id = ? AND dst_id = ? AND edge_type = ? LIMIT 1"
+_SQL_LIST_EDGES = "SELECT * FROM edges ORDER BY created_at DESC LIMIT ?"
+# UNION ALL lets each arm use its own index (ix_edges_src / ix_edges_dst) instead of
+# scanning for the OR; the second arm skips self-loops already returned by the first.
+# Each arm is limited too, so a hub node never reads more than 2 * limit rows.
+_SQL_EDGES_FOR_NODE = """
+    SELECT * FROM (SELECT * FROM edges WHERE src_id = ? ORDER BY created_at DESC LIMIT ?)
+    UNION ALL
+    SELECT * FROM (SELECT * FROM edges WHERE dst_id = ? AND src_id != ? ORDER BY created_at DESC LIMIT ?)
+    ORDER BY created_at DESC LIMIT ?
+"""
+_SQL_DELETE_ALL_EDGES = "DELETE FROM edges"
+# INSERT ... RETURNING * (SQLite >= 3.35) hands back the stored row without a second SELECT
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_SQL_INSERT_SOURCE_FILE_RETURNING = _SQL_INSERT_SOURCE_FILE + "RETURNING *"
+_SQL_INSERT_VOICE_PROFILE_RETURNING = _SQL_INSERT_VOICE_PROFILE + "RETURNING *"
+_SQL_INSERT_IDEA_RETURNING = _SQL_INSERT_IDEA + "RETURNING *"
+_SQL_INSERT_EDGE_RETURNING = _SQL_INSERT_EDGE + "RETURNING *"
+_SQL_EDGE_BY_ID = "SELECT * FROM edges WHERE edge_id = ?"
+# Conflict target must repeat the partial index's WHERE to match uq_idea_request_key
+_SQL_UPSERT_IDEA = _SQL_INSERT_IDEA + """
+    ON CONFLICT(user_id, request_key) WHERE request_key IS NOT NULL
+    DO UPDATE SET updated_at = excluded.updated_at
+"""
+_SQL_UPSERT_IDEA_RETURNING = _SQL_UPSERT_IDEA + "RETURNING node_id"
+# list_idea_nodes variants keyed by (has user_id filter, has voice_profile_id filter)
+_SQL_LIST_IDEAS = {
+    (False, False): "SELECT * FROM idea_nodes ORDER BY created_at DESC LIMIT ?",
+    (True, False): "SELECT * FROM idea_nodes WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+    (False, True): "SELECT * FROM idea_nodes WHERE voice_profile_id = ? ORDER BY created_at DESC LIMIT ?",
+    (True, True): "SELECT * FROM idea_nodes WHERE user_id = ? AND voice_profile_id = ? ORDER BY created_at DESC LIMIT ?",
+}
+# Projected variants built on first use by iter_idea_rows, keyed by (columns, *filters)
+_SQL_LIST_IDEA_ROWS: Dict[Tuple[Tuple[str, ...], bool, bool], str] = {}
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Shared text for empty JSON columns; non-empty values are dumped compactly
+_EMPTY_OBJ = "{}"
+_EMPTY_ARR = "[]"
+
+# (whole second, "YYYY-MM-DDTHH:MM:SS") for the last timestamp formatted; only the
+# microsecond suffix is rebuilt within the same second.
+_NOW_CACHE: Tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    """Local-time ISO-8601 timestamp with microseconds, same shape as datetime.now().isoformat()."""
+    global _NOW_CACHE
+    t = time.time()
+    sec = int(t)
+    cached_sec, prefix = _NOW_CACHE
+    if sec != cached_sec:
+        prefix = datetime.fromtimestamp(sec).strftime("%Y-%m-%dT%H:%M:%S")
+        _NOW_CACHE = (sec, prefix)
+    return f"{prefix}.{int((t - sec) * 1_000_000):06d}"
+
+# Prepared statements kept per connection. Every query is a module-level constant (or
+# a cached projection), so the text is identical on each call and always hits the cache.
+_STATEMENT_CACHE_SIZE = 512
+# Per-connection PRAGMAs, applied to every connection as it is opened
+_PRAGMAS_READ = """
+    PRAGMA busy_timeout=30000;
+    PRAGMA synchronous=NORMAL;      -- WAL is durable across crashes with NORMAL; FULL adds an fsync per commit
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;       -- 64 MB page cache
+    PRAGMA mmap_size=268435456;     -- serve reads of the first 256 MB from the page cache
+"""
+_PRAGMAS_WRITE = _PRAGMAS_READ + """
+    PRAGMA wal_autocheckpoint=1000;
+    PRAGMA journal_size_limit=67108864;  -- truncate the WAL back to 64 MB after checkpoints
+    PRAGMA analysis_limit=400;           -- bound the ANALYZE work done by PRAGMA optimize
+"""
+# Most queued jobs the writer folds into one group-commit transaction
+_WRITE_BATCH_MAX = 64
+# PRAGMA optimize refreshes planner stats that drifted; at most this often per database file
+_OPTIMIZE_INTERVAL_S = 3600.0
+
+
+def _new_id() -> str:
+    """Random 128-bit primary key as 32 hex chars (no UUID object round trip)."""
+    return secrets.token_hex(16)
+
+
+def _new_id_batch(n: int) -> List[str]:
+    """n ids like _new_id() from a single urandom read, for bulk inserts."""
+    buf = os.urandom(16 * n).hex()
+    return [buf[i:i + 32] for i in range(0, 32 * n, 32)]
+
+
+def _dumps(value: Any) -> str:
+    """Compact JSON text; orjson when available, stdlib json otherwise.
+
+    Values JSON has no type for (Path, Decimal, ...) are stored as their str()
+    instead of failing the insert.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _json_obj(value: Optional[Dict[str, Any]]) -> str:
+    return _dumps(value) if value else _EMPTY_OBJ
+
+
+def _json_arr(value: Optional[List[Any]]) -> str:
+    return _dumps(value) if value else _EMPTY_ARR
+
+
+def _idea_params(node_id: str, now: str, user_id: Optional[str], title: Optional[str], content: Optional[str],
+                 tags: Optional[List[str]], voice_profile_id: Optional[str], source_chunk_ids: Optional[List[str]],
+                 source_file_ids: Optional[List[str]], request_key: Optional[str],
+                 metadata: Optional[Dict[str, Any]]) -> tuple:
+    """Row tuple for _SQL_INSERT_IDEA."""
+    return (
+        node_id,
+        user_id,
+        title,
+        content,
+        ",".join(tags or []),
+        voice_profile_id,
+        ",".join(source_chunk_ids or []),
+        ",".join(source_file_ids or []),
+        request_key,
+        _json_obj(metadata),
+        now,
+        now,
+    )
+
+
+def _insert_idea_links(conn: sqlite3.Connection,
+                       links: List[Tuple[str, Optional[List[str]], Optional[List[str]], Optional[List[str]]]]) -> None:
+    """Write (node_id, tags, source_chunk_ids, source_file_ids) into the idea link tables."""
+    tag_rows = [(nid, t) for nid, tags, _, _ in links for t in (tags or [])]
+    chunk_rows = [(nid, cid, i) for nid, _, chunks, _ in links for i, cid in enumerate(chunks or [])]
+    file_rows = [(nid, fid) for nid, _, _, files in links for fid in (files or [])]
+    if tag_rows:
+        conn.executemany(_SQL_INSERT_IDEA_TAG, tag_rows)
+    if chunk_rows:
+        conn.executemany(_SQL_INSERT_IDEA_SOURCE_CHUNK, chunk_rows)
+    if file_rows:
+        conn.executemany(_SQL_INSERT_IDEA_SOURCE_FILE, file_rows)
+
+
+def _open_connection(db_path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        uri = Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30.0, cached_statements=_STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0, cached_statements=_STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    # journal_mode=WAL is persistent in the file and set once by _initialize_database;
+    # only per-connection settings are applied here.
+    # Shared cache is deliberately left off: it regresses badly under WAL
+    try:
+        conn.executescript(_PRAGMAS_READ if readonly else _PRAGMAS_WRITE)
+    except Exception:
+        pass
+    return conn
+
+
+def _file_ino(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except OSError:
+        return None
+
+
+def _optimize(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA optimize")
+
+
+# Queue sentinel: the writer thread closes its connection and exits when it reaches this
+_STOP = object()
+
+
+class _Writer:
+    """Owns the single read-write connection for a database file.
+
+    Writes are queued as callables and run on a daemon thread, so concurrent writers never
+    contend for SQLite's lock or hit busy timeouts. Jobs that are already waiting are
+    group-committed: up to _WRITE_BATCH_MAX of them share one transaction (and one WAL
+    commit), each inside its own SAVEPOINT so a failing job is rolled back alone.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.ino = _file_ino(db_path)
+        # (fn, future, exclusive); exclusive jobs manage their own transaction and run alone
+        self._queue: "queue.Queue[Tuple[Callable[[sqlite3.Connection], Any], Future, bool]]" = queue.Queue()
+        self._last_optimize = time.monotonic()
+        # Guards _stopped so no job is queued behind the stop sentinel
+        self._state_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish the jobs already queued, then close the connection and end the thread."""
+        with self._state_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any], exclusive: bool = False) -> Any:
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("nested write submitted from the writer thread")
+        fut: Future = Future()
+        with self._state_lock:
+            stopped = self._stopped
+            if not stopped:
+                self._queue.put((fn, fut, exclusive))
+        if stopped:
+            # Replaced while the caller still held this writer: hand the job to the current one
+            return _get_writer(self.db_path).submit(fn, exclusive)
+        return fut.result()
+
+    def optimize_if_due(self) -> None:
+        """Queue a PRAGMA optimize (without waiting) if the last one is older than the interval."""
+        now = time.monotonic()
+        if now - self._last_optimize < _OPTIMIZE_INTERVAL_S:
+            return
+        self._last_optimize = now
+        with self._state_lock:
+            if not self._stopped:
+                self._queue.put((_optimize, Future(), True))
+
+    def _run(self) -> None:
+        conn = _open_connection(self.db_path)
+        try:
+            self._loop(conn)
+        finally:
+            conn.close()
+
+    def _loop(self, conn: sqlite3.Connection) -> None:
+        held = None
+        while True:
+            first = held or self._queue.get()
+            held = None
+            if first is _STOP:
+                return
+            batch = [first]
+            if not first[2]:
+                while len(batch) < _WRITE_BATCH_MAX:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP or item[2]:
+                        held = item  # runs alone (or stops the loop) on the next turn
+                        break
+                    batch.append(item)
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if len(batch) == 1:
+                self._run_one(conn, batch[0])
+            elif batch:
+                self._run_group(conn, batch)
+
+    @staticmethod
+    def _run_one(conn: sqlite3.Connection, item: Tuple[Callable[[sqlite3.Connection], Any], Future, bool]) -> None:
+        fn, fut, _ = item
+        try:
+            # Commits on success, rolls back on error; a no-op if fn already committed
+            with conn:
+                result = fn(conn)
+        except BaseException as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(result)
+
+    @staticmethod
+    def _run_group(conn: sqlite3.Connection, batch: List[Tuple[Callable[[sqlite3.Connection], Any], Future, bool]]) -> None:
+        outcomes: List[Tuple[bool, Any]] = []
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, _, _ in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((False, e))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((True, result))
+            conn.commit()
+        except BaseException as e:
+            # The shared transaction itself failed: nothing in the group was committed
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+            return
+        for (ok, value), (_, fut, _) in zip(outcomes, batch):
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+
+
+# One writer per database file for the whole process; SQLiteManager instances are cheap
+# and created per request, so they must not each spawn a thread.
+_WRITERS: Dict[str, _Writer] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def _get_writer(db_path: str, recheck: bool = False) -> _Writer:
+    key = os.path.abspath(db_path)
+    writer = _WRITERS.get(key)
+    if writer is not None and not recheck:
+        return writer
+    stale = None
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is not None and recheck:
+            # The file was deleted/replaced under us (tests, manual resets): drop the stale handle
+            ino = _file_ino(key)
+            if ino is None or ino != writer.ino:
+                stale, writer = writer, None
+        if writer is None:
+            writer = _Writer(key)
+            _WRITERS[key] = writer
+    if stale is not None:
+        # Jobs already queued on the old writer still run; then its thread and connection go away
+        stale.stop()
+    return writer
+
+# Read-only connections keyed by database file, scoped per context: each thread starts
+# with an empty context (so this behaves like threading.local there) and each asyncio
+# task gets its own copy. The dict is replaced, never mutated, so a connection opened
+# after a task was spawned is never shared with it.
+_READERS: ContextVar[Dict[str, Tuple[sqlite3.Connection, sqlite3.Cursor]]] = ContextVar("sqlite_readers", default={})
+
+# Database files already created/migrated in this process, mapped to the file's inode at the
+# time so a deleted or replaced file is migrated again. The app builds a SQLiteManager per
+# request; without this every request would re-run all the DDL and column checks.
+_MIGRATED: Dict[str, int] = {}
+_MIGRATED_LOCK = threading.Lock()
 
 
 class SQLiteManager:
     def __init__(self, db_path: str = "storage/sqlite/metadata.db"):
         self.db_path = db_path
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        # one connection per thread to avoid cross-thread usage errors
-        self._local = threading.local()
-        self._initialize_database()
+        # read-only connections live in _READERS (per context); writes go through the shared writer
+        self._key = os.path.abspath(db_path)
+        # Migrations run once per process and file; CRUD methods rely on the schema being in place
+        self._schema_ready = False
+        with _MIGRATED_LOCK:
+            ino = _file_ino(self._key)
+            if ino is None or _MIGRATED.get(self._key) != ino:
+                self._initialize_database()
+                _MIGRATED[self._key] = _file_ino(self._key)
+        self._schema_ready = True
+        _get_writer(self.db_path, recheck=True)
 
-    def __del__(self):
-        # Best-effort to close any open connection to release file locks on Windows
-        try:
-            self.close()
-        except Exception:
-            pass
+    def _new_connection(self, readonly: bool = False) -> sqlite3.Connection:
+        return _open_connection(self.db_path, readonly=readonly)
 
-    def _new_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
-        conn.row_factory = sqlite3.Row
-        try:
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute("PRAGMA busy_timeout=30000;")
-        except Exception:
-            pass
-        return conn
+    def _write(self, fn: Callable[[sqlite3.Connection], Any], exclusive: bool = False) -> Any:
+        """Run fn(conn) on the shared writer connection and return its result.
+
+        fn may be group-committed with other queued jobs; pass exclusive=True when it
+        issues its own BEGIN/COMMIT.
+        """
+        return _get_writer(self.db_path).submit(fn, exclusive)
+
+    def _reader(self) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+        readers = _READERS.get()
+        entry = readers.get(self._key)
+        if entry is None:
+            conn = self._new_connection(readonly=True)
+            entry = (conn, conn.cursor())
+            _READERS.set({**readers, self._key: entry})
+        return entry
 
     def connect(self) -> sqlite3.Connection:
-        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
-        if conn is None:
-            conn = self._new_connection()
-            self._local.conn = conn
-        return conn
+        return self._reader()[0]
+
+    def _cursor(self) -> sqlite3.Cursor:
+        """This context's reusable reader cursor, for reads that are fully consumed before returning.
+
+        Single-row lookups go through _first instead: a partly consumed statement left on this
+        cursor would hold the reader on a stale snapshot.
+
+        Generators (iter_*) take their own cursor since callers may interleave other reads.
+        """
+        return self._reader()[1]
 
     def close(self) -> None:
-        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
-        if conn is not None:
-            try:
-                conn.close()
-            finally:
-                self._local.conn = None
+        """Close this context's read connection to the database (reopened lazily on next use).
+
+        Also lets the writer run PRAGMA optimize if it is due; readers are read-only and
+        cannot write the planner statistics themselves.
+        """
+        try:
+            _get_writer(self.db_path).optimize_if_due()
+        except Exception:
+            pass
+        readers = _READERS.get()
+        entry = readers.get(self._key)
+        if entry is not None:
+            _READERS.set({k: v for k, v in readers.items() if k != self._key})
+            entry[0].close()
 
     def _initialize_database(self):
         # Use a short-lived connection for migrations to avoid pinning a cross-thread handle
         conn = self._new_connection()
         cur = conn.cursor()
+        if str(cur.execute("PRAGMA journal_mode").fetchone()[0]).lower() != "wal":
+            try:
+                cur.execute("PRAGMA journal_mode=WAL")
+            except Exception:
+                pass
 
         # users
         cur.execute("""
@@ -101,25 +585,12 @@ class SQLiteManager:
             metadata TEXT
         )""")
 
-        # idea_nodes (schema will be ensured on first use)
+        # idea_nodes (columns are added by _ensure_table_columns below)
         cur.execute("""CREATE TABLE IF NOT EXISTS idea_nodes (node_id TEXT PRIMARY KEY)""")
 
-        # edges (schema will be ensured on first use)
+        # edges (columns are added by _ensure_table_columns below)
         cur.execute("""CREATE TABLE IF NOT EXISTS edges (edge_id TEXT PRIMARY KEY)""")
 
-        # voice_profiles (minimal fields to support active profile lookup)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS voice_profiles (
-            profile_id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            profile_name TEXT,
-            analysis_metrics TEXT,
-            source_file_ids TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            active INTEGER NOT NULL DEFAULT 1
-        )""")
-
         # voice_profiles (for style learning)
         cur.execute("""
         CREATE TABLE IF NOT EXISTS voice_profiles (
@@ -181,15 +652,64 @@ class SQLiteManager:
             """)
         except Exception:
             pass
+        # Normalized idea links; backfilled from the comma-joined columns the first time
+        had_links = cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'idea_tags'").fetchone()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS idea_tags (
+            node_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (node_id, tag)
+        ) WITHOUT ROWID""")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS idea_source_chunks (
+            node_id TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            ord INTEGER NOT NULL,
+            PRIMARY KEY (node_id, ord)
+        ) WITHOUT ROWID""")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS idea_source_files (
+            node_id TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            PRIMARY KEY (node_id, file_id)
+        ) WITHOUT ROWID""")
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_idea_tags_tag ON idea_tags(tag)")
+        cur.execute(_SQL_IDEA_DELETE_TRIGGER)
+        if not had_links:
+            split = lambda v: [p for p in (v or "").split(",") if p]
+            rows = cur.execute("SELECT node_id, tags, source_chunk_ids, source_file_ids FROM idea_nodes").fetchall()
+            _insert_idea_links(conn, [(r[0], split(r[1]), split(r[2]), split(r[3])) for r in rows])
+
+        # Composite indexes matching the hot lookups' filter + sort columns
+        for ddl in _IDEA_SECONDARY_INDEXES.values():
+            try:
+                cur.execute(ddl)
+            except Exception:
+                pass
+        for ddl in (
+            "CREATE INDEX IF NOT EXISTS ix_voice_user_active ON voice_profiles(user_id, is_active, updated_at DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_edges_src ON edges(src_id, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_edges_dst ON edges(dst_id, created_at DESC)",
+            # edge_exists' exact triple
+            "CREATE INDEX IF NOT EXISTS ix_edges_src_dst_type ON edges(src_id, dst_id, edge_type)",
+            "CREATE INDEX IF NOT EXISTS ix_source_files_hash ON source_files(content_hash)",
+            "CREATE INDEX IF NOT EXISTS ix_source_files_path ON source_files(filepath)",
+            # chunk listings by file, already in chunk order
+            "CREATE INDEX IF NOT EXISTS ix_doc_chunks_file ON doc_chunks(source_file_id, chunk_index)",
+        ):
+            try:
+                cur.execute(ddl)
+            except Exception:
+                pass
         conn.commit()
         conn.close()
 
     def _ensure_table_columns(self, cur: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
-        cur.execute(f"PRAGMA table_info({table})")
-        existing = {row[1] for row in cur.fetchall()}  # column names
+        existing = {row[0] for row in cur.execute(_SQL_TABLE_COLUMNS, (table,))}
         for name, decl in columns.items():
             if name not in existing:
                 try:
+                    # DDL cannot bind identifiers; this only runs when a column is actually missing
                     cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
                 except sqlite3.OperationalError as e:
                     # Handle concurrent migrations or already-added columns gracefully
@@ -198,32 +718,78 @@ class SQLiteManager:
                     else:
                         raise
 
+    def _executemany_immediate(self, sql: str, rows: List[tuple],
+                               then: Optional[Callable[[sqlite3.Connection], Any]] = None) -> None:
+        """Run one executemany inside a single BEGIN IMMEDIATE ... COMMIT.
+
+        Taking the write lock up front avoids a deferred->immediate upgrade stall, and the
+        whole batch pays for one commit instead of one per row. `then(conn)` runs inside
+        the same transaction.
+        """
+        def _run(conn: sqlite3.Connection) -> None:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(sql, rows)
+                if then is not None:
+                    then(conn)
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+
+        self._write(_run, exclusive=True)
+
+    def _first(self, sql: str, params: tuple) -> Optional[sqlite3.Row]:
+        """First row of a query, on a short-lived cursor that is closed right after.
+
+        fetchone() on the shared cursor would leave the statement open when more rows match,
+        and an open read statement pins the connection to its WAL snapshot: later reads would
+        miss writes committed since.
+        """
+        cur = self.connect().cursor()
+        try:
+            return cur.execute(sql, params).fetchone()
+        finally:
+            cur.close()
+
+    def _fetch_one(self, sql: str, params: tuple) -> Optional[Dict]:
+        row = self._first(sql, params)
+        return dict(row) if row else None
+
+    def _insert_returning(self, sql: str, returning_sql: str, select_sql: str, params: tuple,
+                          then: Optional[Callable[[sqlite3.Connection], Any]] = None) -> Dict:
+        """Insert params[0]'s row and return it as a dict, in one writer job.
+
+        Falls back to INSERT + SELECT on the writer connection when RETURNING is unavailable.
+        `then(conn)` runs afterwards in the same transaction.
+        """
+        def _run(conn: sqlite3.Connection) -> Dict:
+            if _HAS_RETURNING:
+                row = conn.execute(returning_sql, params).fetchone()
+            else:
+                conn.execute(sql, params)
+                row = conn.execute(select_sql, (params[0],)).fetchone()
+            if then is not None:
+                then(conn)
+            return dict(row)
+
+        return self._write(_run)
+
     # Users
     def create_user(self, username: str, preferences: Optional[Dict[str, Any]] = None) -> str:
-        user_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO users (user_id, username, created_at, updated_at, preferences, writing_style_profile_id, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, username, now, now, json.dumps(preferences or {}), None, json.dumps({})))
-        conn.commit()
+        user_id = _new_id()
+        now = _now_iso()
+        params = (user_id, username, now, now, _json_obj(preferences), None, _EMPTY_OBJ)
+        self._write(lambda conn: conn.execute(_SQL_INSERT_USER, params))
         return user_id
 
     def get_user_by_username(self, username: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE username = ?", (username,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_USER_BY_NAME, (username,))
 
     def get_user(self, user_id: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_USER_BY_ID, (user_id,))
 
     # Source files CRUD
     def create_source_file(self,
@@ -237,191 +803,98 @@ class SQLiteManager:
                            tags: Optional[List[str]] = None,
                            metadata: Optional[Dict[str, Any]] = None,
                            processing_status: str = "new") -> str:
-        file_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO source_files
-            (file_id, filename, filepath, file_type, file_size, uploaded_at, uploaded_by,
-             content_hash, tags, category, metadata, processing_status, processed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        params = self._source_file_params(filename, filepath, file_type, file_size, uploaded_by,
+                                          content_hash, category, tags, metadata, processing_status)
+        self._write(lambda conn: conn.execute(_SQL_INSERT_SOURCE_FILE, params))
+        return params[0]
+
+    def create_source_file_returning(self, *args, **kwargs) -> Dict:
+        """Same arguments as create_source_file; returns the stored row instead of its id."""
+        params = self._source_file_params(*args, **kwargs)
+        return self._insert_returning(_SQL_INSERT_SOURCE_FILE, _SQL_INSERT_SOURCE_FILE_RETURNING,
+                                      _SQL_SOURCE_FILE_BY_ID, params)
+
+    def _source_file_params(self,
+                            filename: str,
+                            filepath: str,
+                            file_type: str,
+                            file_size: int,
+                            uploaded_by: str,
+                            content_hash: str,
+                            category: str,
+                            tags: Optional[List[str]] = None,
+                            metadata: Optional[Dict[str, Any]] = None,
+                            processing_status: str = "new") -> tuple:
+        file_id = _new_id()
+        now = _now_iso()
+        return (
             file_id, filename, filepath, file_type, file_size, now, uploaded_by,
-            content_hash, json.dumps(tags or []), category, json.dumps(metadata or {}),
+            content_hash, _json_arr(tags), category, _json_obj(metadata),
             processing_status, None
-        ))
-        conn.commit()
-        return file_id
+        )
 
     def get_source_file(self, file_id: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM source_files WHERE file_id = ?", (file_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_SOURCE_FILE_BY_ID, (file_id,))
 
     def update_source_file_status(self, file_id: str, status: str, processed_at: Optional[str] = None) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE source_files
-            SET processing_status = ?, processed_at = ?
-            WHERE file_id = ?
-        """, (status, processed_at or datetime.now().isoformat(), file_id))
-        conn.commit()
+        params = (status, processed_at or _now_iso(), file_id)
+        self._write(lambda conn: conn.execute(_SQL_UPDATE_SOURCE_FILE_STATUS, params))
 
     def delete_source_file(self, file_id: str) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM source_files WHERE file_id = ?", (file_id,))
-        conn.commit()
-
-    # ---------------------- Ideas ----------------------
-    def _ensure_idea_schema(self, cur: sqlite3.Cursor) -> None:
-        self._ensure_table_columns(cur, "idea_nodes", {
-            "user_id": "TEXT",
-            "title": "TEXT",
-            "content": "TEXT",
-            "tags": "TEXT",
-            "voice_profile_id": "TEXT",
-            "source_chunk_ids": "TEXT",
-            "source_file_ids": "TEXT",
-            "metadata": "TEXT",
-            "created_at": "TEXT",
-            "updated_at": "TEXT",
-        })
-
-    def create_idea_node(self,
-                          user_id: str,
-                          title: str,
-                          content: str,
-                          tags: List[str],
-                          voice_profile_id: str | None,
-                          source_chunk_ids: List[str] | None = None,
-                          source_file_ids: List[str] | None = None,
-                          request_key: str | None = None,
-                          metadata: Optional[Dict[str, Any]] = None) -> str:
-        node_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_idea_schema(cur)
-        cur.execute(
-            """
-            INSERT INTO idea_nodes (
-                node_id, user_id, title, content, tags, voice_profile_id,
-                source_chunk_ids, source_file_ids, request_key, metadata, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                node_id, user_id, title, content, 
-                ",".join(tags or []), voice_profile_id,
-                ",".join(source_chunk_ids or []), ",".join(source_file_ids or []),
-                request_key,
-                json.dumps(metadata or {}), now, now,
-            ),
-        )
-        conn.commit()
-        return node_id
-
-    def list_idea_nodes(self, limit: int = 100) -> List[Dict[str, Any]]:
-        conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_idea_schema(cur)
-        cur.execute(
-            "SELECT node_id, user_id, title, content, tags, voice_profile_id, created_at, updated_at FROM idea_nodes ORDER BY datetime(created_at) DESC LIMIT ?",
-            (limit,),
-        )
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        self._write(lambda conn: conn.execute(_SQL_DELETE_SOURCE_FILE, (file_id,)))
 
-    def get_idea_by_request_key(self, user_id: str, request_key: str) -> Optional[Dict[str, Any]]:
-        """Return the most recent idea with the same (user_id, request_key) if it exists."""
+    # Listings stream rows off the cursor; the list_*/get_* wrappers keep the old return types.
+    def iter_source_files(self, category: Optional[str] = None) -> Iterator[Dict]:
         conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_idea_schema(cur)
-        cur.execute(
-            "SELECT * FROM idea_nodes WHERE user_id = ? AND request_key = ? ORDER BY datetime(created_at) DESC LIMIT 1",
-            (user_id, request_key),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
-
-    def delete_all_idea_nodes(self) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM idea_nodes")
-        conn.commit()
-
-    # ---------------------- Edges ----------------------
-    def _ensure_edge_schema(self, cur: sqlite3.Cursor) -> None:
-        self._ensure_table_columns(cur, "edges", {
-            "src_id": "TEXT",
-            "dst_id": "TEXT",
-            "edge_type": "TEXT",
-            "weight": "REAL",
-            "metadata": "TEXT",
-            "created_at": "TEXT",
-        })
+        if category:
+            cur = conn.execute(_SQL_SOURCE_FILES_BY_CATEGORY, (category,))
+        else:
+            cur = conn.execute(_SQL_SOURCE_FILES_ALL)
+        for r in cur:
+            yield dict(r)
 
-    def create_edge(self, src_id: str, dst_id: str, edge_type: str, weight: float = 1.0, metadata: Optional[Dict[str, Any]] = None) -> str:
-        edge_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_edge_schema(cur)
-        cur.execute(
-            """
-            INSERT INTO edges (edge_id, src_id, dst_id, edge_type, weight, metadata, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (edge_id, src_id, dst_id, edge_type, weight, json.dumps(metadata or {}), now),
-        )
-        conn.commit()
-        return edge_id
+    def get_source_files(self, category: Optional[str] = None) -> List[Dict]:
+        return list(self.iter_source_files(category))
 
-    def delete_all_edges(self) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM edges")
-        conn.commit()
+    def source_file_exists(self, content_hash: str, filepath: str) -> bool:
+        """True if a source file with this content hash or this path was already recorded."""
+        return self._first(_SQL_SOURCE_FILE_EXISTS, (content_hash, filepath)) is not None
 
-    def list_all_edges(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_edge_schema(cur)
-        cur.execute("SELECT * FROM edges ORDER BY datetime(created_at) DESC LIMIT ?", (limit,))
-        return [dict(r) for r in cur.fetchall()]
+    # Chunks
+    def create_doc_chunks_bulk(
+        self,
+        source_file_id: str,
+        chunks: List[Tuple[int, int, str]],
+        chunk_type: str = "paragraph",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        """Insert a file's (start_char, end_char, content) chunks in one transaction.
 
-    # ---------------------- Voice Profiles ----------------------
-    def get_active_voice_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM voice_profiles WHERE user_id = ? AND active = 1 ORDER BY datetime(updated_at) DESC LIMIT 1",
-            (user_id,),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
+        chunk_index is the position in `chunks`; every row shares `metadata`.
+        """
+        assert self._schema_ready, "schema not initialized"
+        now = _now_iso()
+        md = _json_obj(metadata)
+        chunk_ids = _new_id_batch(len(chunks))
+        rows = [
+            (chunk_id, source_file_id, idx, content, len(content), start, end, None, chunk_type, now, md)
+            for idx, (chunk_id, (start, end, content)) in enumerate(zip(chunk_ids, chunks))
+        ]
+        if rows:
+            self._executemany_immediate(_SQL_INSERT_DOC_CHUNK, rows)
+        return chunk_ids
 
-    def get_source_files(self, category: Optional[str] = None) -> List[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        if category:
-            cur.execute("SELECT * FROM source_files WHERE category = ? ORDER BY uploaded_at DESC", (category,))
-        else:
-            cur.execute("SELECT * FROM source_files ORDER BY uploaded_at DESC")
-        rows = [dict(r) for r in cur.fetchall()]
-        return rows
+    def iter_chunks_for_file(self, source_file_id: str) -> Iterator[Dict]:
+        for r in self.connect().execute(_SQL_CHUNKS_FOR_FILE, (source_file_id,)):
+            yield dict(r)
 
-    # Chunks
     def get_chunks_for_file(self, source_file_id: str) -> List[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM doc_chunks WHERE source_file_id = ? ORDER BY chunk_index ASC", (source_file_id,))
-        rows = [dict(r) for r in cur.fetchall()]
-        return rows
+        return list(self.iter_chunks_for_file(source_file_id))
+
+    def iter_chunk_contents(self, source_file_id: str) -> Iterator[str]:
+        """Yield only the chunk texts for a file, in chunk order."""
+        for r in self.connect().execute(_SQL_CHUNK_CONTENTS_FOR_FILE, (source_file_id,)):
+            yield r[0]
 
     # Voice profiles
     def _generate_token_from_name(self, profile_name: str) -> str:
@@ -435,119 +908,83 @@ class SQLiteManager:
         base = re.sub(r"[^a-z0-9]", "", (profile_name or "").lower())
         if not base:
             base = "voice"
-        conn = self.connect()
-        cur = conn.cursor()
-        for _ in range(100):
-            suffix = f"{random.randint(0, 9999):04d}"
-            token = f"{base}{suffix}"
-            cur.execute("SELECT 1 FROM voice_profiles WHERE auth_token = ? LIMIT 1", (token,))
-            if not cur.fetchone():
-                return token
-        # Fallback to uuid if many collisions (extremely unlikely)
-        return base + uuid.uuid4().hex[:4]
+        taken = {r[0] for r in self._cursor().execute(_SQL_VOICE_TOKENS_TAKEN, (base + "0000", base + "9999", len(base) + 4))}
+        if len(taken) < 10000:
+            while True:
+                token = f"{base}{random.randint(0, 9999):04d}"
+                if token not in taken:
+                    return token
+        # Fallback to random hex once every 4-digit suffix is used
+        return base + secrets.token_hex(2)
 
     def create_voice_profile(self, user_id: str, profile_name: str, source_file_ids: List[str], analysis_metrics: Dict) -> str:
-        profile_id = str(uuid.uuid4())
+        params = self._voice_profile_params(user_id, profile_name, source_file_ids, analysis_metrics)
+        profile_id = params[0]
+
+        def _run(conn: sqlite3.Connection) -> None:
+            conn.execute(_SQL_INSERT_VOICE_PROFILE, params)
+            # ensure single active profile per user
+            conn.execute(_SQL_DEACTIVATE_OTHER_VOICES, (user_id, profile_id))
+
+        self._write(_run)
+        return profile_id
+
+    def create_voice_profile_returning(self, user_id: str, profile_name: str, source_file_ids: List[str], analysis_metrics: Dict) -> Dict:
+        """Like create_voice_profile, but returns the stored row (including auth_token)."""
+        params = self._voice_profile_params(user_id, profile_name, source_file_ids, analysis_metrics)
+        return self._insert_returning(
+            _SQL_INSERT_VOICE_PROFILE, _SQL_INSERT_VOICE_PROFILE_RETURNING, _SQL_VOICE_BY_ID, params,
+            then=lambda conn: conn.execute(_SQL_DEACTIVATE_OTHER_VOICES, (user_id, params[0])),
+        )
+
+    def _voice_profile_params(self, user_id: str, profile_name: str, source_file_ids: List[str], analysis_metrics: Dict) -> tuple:
+        profile_id = _new_id()
         auth_token = self._generate_token_from_name(profile_name)
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO voice_profiles (profile_id, user_id, profile_name, is_active, analysis_metrics, source_file_ids, auth_token, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                profile_id,
-                user_id,
-                profile_name,
-                1,
-                json.dumps(analysis_metrics or {}),
-                json.dumps(source_file_ids or []),
-                auth_token,
-                now,
-                now,
-            ),
+        now = _now_iso()
+        return (
+            profile_id,
+            user_id,
+            profile_name,
+            1,
+            _json_obj(analysis_metrics),
+            _json_arr(source_file_ids),
+            auth_token,
+            now,
+            now,
         )
-        # ensure single active profile per user
-        cur.execute("UPDATE voice_profiles SET is_active = 0 WHERE user_id = ? AND profile_id != ?", (user_id, profile_id))
-        conn.commit()
-        return profile_id
 
     def get_active_voice_profile(self, user_id: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM voice_profiles WHERE user_id = ? AND is_active = 1 ORDER BY updated_at DESC LIMIT 1",
-            (user_id,),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_ACTIVE_VOICE_PROFILE, (user_id,))
 
     def get_voice_profile_by_token(self, token: str) -> Optional[Dict]:
         if not token:
             return None
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM voice_profiles WHERE auth_token = ? LIMIT 1", (token,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_VOICE_BY_TOKEN, (token,))
 
     def set_active_voice_profile(self, profile_id: str) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT user_id FROM voice_profiles WHERE profile_id = ?", (profile_id,))
-        row = cur.fetchone()
-        if not row:
-            return
-        user_id = row[0]
-        cur.execute("UPDATE voice_profiles SET is_active = CASE WHEN profile_id = ? THEN 1 ELSE 0 END WHERE user_id = ?", (profile_id, user_id))
-        conn.commit()
+        def _run(conn: sqlite3.Connection) -> None:
+            row = conn.execute(_SQL_VOICE_OWNER, (profile_id,)).fetchone()
+            if not row:
+                return
+            user_id = row[0]
+            conn.execute(_SQL_SET_ACTIVE_VOICE, (profile_id, user_id))
+
+        self._write(_run)
 
     def get_voice_profile(self, profile_id: str) -> Optional[Dict]:
         """Fetch a single voice profile by id."""
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM voice_profiles WHERE profile_id = ?", (profile_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_VOICE_BY_ID, (profile_id,))
 
     def list_voice_profiles(self, user_id: str) -> List[Dict]:
         """List all voice profiles for a given user (most recent first)."""
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM voice_profiles WHERE user_id = ? ORDER BY datetime(updated_at) DESC",
-            (user_id,),
-        )
-        return [dict(r) for r in cur.fetchall()]
+        return [dict(r) for r in self._cursor().execute(_SQL_VOICES_FOR_USER, (user_id,))]
 
     def delete_ideas_and_edges_for_profile(self, user_id: str, voice_profile_id: str) -> None:
         """Delete all ideas and related edges scoped to a specific (user_id, voice_profile_id).
 
-        Edges are removed if either endpoint belongs to a deleted idea.
+        Edges are removed if either endpoint belongs to a deleted idea (via trg_idea_nodes_cascade).
         """
-        conn = self.connect()
-        cur = conn.cursor()
-        # Delete edges connected to ideas for this profile
-        cur.execute(
-            """
-            DELETE FROM edges
-            WHERE src_id IN (
-                SELECT node_id FROM idea_nodes WHERE user_id = ? AND voice_profile_id = ?
-            )
-            OR dst_id IN (
-                SELECT node_id FROM idea_nodes WHERE user_id = ? AND voice_profile_id = ?
-            )
-            """,
-            (user_id, voice_profile_id, user_id, voice_profile_id),
-        )
-        # Delete the ideas themselves
-        cur.execute(
-            "DELETE FROM idea_nodes WHERE user_id = ? AND voice_profile_id = ?",
-            (user_id, voice_profile_id),
-        )
-        conn.commit()
+        self._write(lambda conn: conn.execute(_SQL_DELETE_IDEAS_FOR_PROFILE, (user_id, voice_profile_id)))
 
     # Ideas
     def create_idea_node(
@@ -562,149 +999,249 @@ class SQLiteManager:
         request_key: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> str:
-        node_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        # ensure columns
-        self._ensure_table_columns(cur, "idea_nodes", {
-            "user_id": "TEXT",
-            "title": "TEXT",
-            "content": "TEXT",
-            "tags": "TEXT",
-            "voice_profile_id": "TEXT",
-            "source_chunk_ids": "TEXT",
-            "source_file_ids": "TEXT",
-            "request_key": "TEXT",
-            "metadata": "TEXT",
-            "created_at": "TEXT",
-            "updated_at": "TEXT",
-        })
-        cur.execute(
-            """
-            INSERT INTO idea_nodes (node_id, user_id, title, content, tags, voice_profile_id, source_chunk_ids, source_file_ids, request_key, metadata, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                node_id,
-                user_id,
-                title,
-                content,
-                ",".join(tags or []),
-                voice_profile_id,
-                ",".join(source_chunk_ids or []),
-                ",".join(source_file_ids or []),
-                request_key,
-                json.dumps(metadata or {}),
-                now,
-                now,
-            ),
-        )
-        conn.commit()
-        return node_id
+        assert self._schema_ready, "schema not initialized"
+        params = _idea_params(_new_id(), _now_iso(), user_id, title, content, tags, voice_profile_id,
+                              source_chunk_ids, source_file_ids, request_key, metadata)
+        links = [(params[0], tags, source_chunk_ids, source_file_ids)]
+
+        def _run(conn: sqlite3.Connection) -> None:
+            conn.execute(_SQL_INSERT_IDEA, params)
+            _insert_idea_links(conn, links)
+
+        self._write(_run)
+        return params[0]
+
+    def create_idea_node_returning(
+        self,
+        user_id: str,
+        title: str,
+        content: str,
+        tags: List[str],
+        voice_profile_id: Optional[str] = None,
+        source_chunk_ids: Optional[List[str]] = None,
+        source_file_ids: Optional[List[str]] = None,
+        request_key: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict:
+        """Like create_idea_node, but returns the stored row instead of its id."""
+        assert self._schema_ready, "schema not initialized"
+        params = _idea_params(_new_id(), _now_iso(), user_id, title, content, tags, voice_profile_id,
+                              source_chunk_ids, source_file_ids, request_key, metadata)
+        links = [(params[0], tags, source_chunk_ids, source_file_ids)]
+        return self._insert_returning(_SQL_INSERT_IDEA, _SQL_INSERT_IDEA_RETURNING, _SQL_IDEA_BY_ID, params,
+                                      then=lambda conn: _insert_idea_links(conn, links))
+
+    def upsert_idea_node(
+        self,
+        user_id: str,
+        title: str,
+        content: str,
+        tags: List[str],
+        voice_profile_id: Optional[str] = None,
+        source_chunk_ids: Optional[List[str]] = None,
+        source_file_ids: Optional[List[str]] = None,
+        request_key: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, bool]:
+        """Insert an idea unless (user_id, request_key) already exists; one statement, no race.
+
+        Returns (node_id, created). On conflict the existing row's updated_at is bumped and
+        its node_id returned with created=False.
+        """
+        assert self._schema_ready, "schema not initialized"
+        params = _idea_params(_new_id(), _now_iso(), user_id, title, content, tags, voice_profile_id,
+                              source_chunk_ids, source_file_ids, request_key, metadata)
+
+        def _run(conn: sqlite3.Connection) -> str:
+            if _HAS_RETURNING:
+                node_id = conn.execute(_SQL_UPSERT_IDEA_RETURNING, params).fetchone()[0]
+            else:
+                conn.execute(_SQL_UPSERT_IDEA, params)
+                if request_key is None:
+                    node_id = params[0]
+                else:
+                    node_id = conn.execute(_SQL_IDEA_BY_REQUEST_KEY, (user_id, request_key)).fetchone()["node_id"]
+            if node_id == params[0]:
+                _insert_idea_links(conn, [(node_id, tags, source_chunk_ids, source_file_ids)])
+            return node_id
+
+        node_id = self._write(_run)
+        return node_id, node_id == params[0]
+
+    def create_idea_nodes_bulk(self, ideas: List[Dict[str, Any]]) -> List[str]:
+        """Insert many ideas in one transaction.
+
+        Each item takes the same keys as create_idea_node's arguments. Returns node_ids in order.
+        """
+        assert self._schema_ready, "schema not initialized"
+        node_ids, rows, links = self._idea_bulk_rows(ideas)
+        if rows:
+            self._executemany_immediate(_SQL_INSERT_IDEA, rows, then=lambda conn: _insert_idea_links(conn, links))
+        return node_ids
+
+    def bulk_ingest_ideas(self, ideas: List[Dict[str, Any]]) -> List[str]:
+        """Insert a large batch of ideas (e.g. reseeding a profile); same input as create_idea_nodes_bulk.
+
+        For batches of at least _BULK_REINDEX_MIN rows the non-unique idea_nodes indexes are
+        dropped for the insert and rebuilt once afterwards. It all happens in one transaction,
+        so readers never observe the indexes missing.
+        """
+        if len(ideas) < _BULK_REINDEX_MIN:
+            return self.create_idea_nodes_bulk(ideas)
+        assert self._schema_ready, "schema not initialized"
+        node_ids, rows, links = self._idea_bulk_rows(ideas)
+
+        def _run(conn: sqlite3.Connection) -> None:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql in _SQL_DROP_IDEA_SECONDARY_INDEXES:
+                    conn.execute(sql)
+                conn.executemany(_SQL_INSERT_IDEA, rows)
+                _insert_idea_links(conn, links)
+                for ddl in _IDEA_SECONDARY_INDEXES.values():
+                    conn.execute(ddl)
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+
+        self._write(_run, exclusive=True)
+        return node_ids
+
+    def _idea_bulk_rows(self, ideas: List[Dict[str, Any]]) -> Tuple[List[str], List[tuple], List[tuple]]:
+        now = _now_iso()
+        node_ids = _new_id_batch(len(ideas))
+        rows = [
+            _idea_params(
+                node_id, now, it.get("user_id"), it.get("title"), it.get("content"), it.get("tags"),
+                it.get("voice_profile_id"), it.get("source_chunk_ids"), it.get("source_file_ids"),
+                it.get("request_key"), it.get("metadata"),
+            )
+            for node_id, it in zip(node_ids, ideas)
+        ]
+        links = [
+            (node_id, it.get("tags"), it.get("source_chunk_ids"), it.get("source_file_ids"))
+            for node_id, it in zip(node_ids, ideas)
+        ]
+        return node_ids, rows, links
 
     def get_idea_node(self, node_id: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM idea_nodes WHERE node_id = ?", (node_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return self._fetch_one(_SQL_IDEA_BY_ID, (node_id,))
 
-    def list_idea_nodes(self, limit: int = 100, user_id: Optional[str] = None, voice_profile_id: Optional[str] = None) -> List[Dict]:
-        """List idea nodes with optional filters for user and voice profile.
+    def iter_idea_nodes(self, limit: int = 100, user_id: Optional[str] = None, voice_profile_id: Optional[str] = None) -> Iterator[Dict]:
+        """Iterate idea nodes with optional filters for user and voice profile.
 
         This enables per-voice-profile data segregation at the query layer.
         """
-        conn = self.connect()
-        cur = conn.cursor()
-        where = []
-        params: List[Any] = []
-        if user_id:
-            where.append("user_id = ?")
-            params.append(user_id)
-        if voice_profile_id:
-            where.append("voice_profile_id = ?")
-            params.append(voice_profile_id)
-        sql = "SELECT * FROM idea_nodes"
-        if where:
-            sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY datetime(created_at) DESC LIMIT ?"
+        params: List[Any] = [p for p in (user_id, voice_profile_id) if p]
+        params.append(limit)
+        for r in self.connect().execute(_SQL_LIST_IDEAS[(bool(user_id), bool(voice_profile_id))], tuple(params)):
+            yield dict(r)
+
+    def list_idea_nodes(self, limit: int = 100, user_id: Optional[str] = None, voice_profile_id: Optional[str] = None) -> List[Dict]:
+        return list(self.iter_idea_nodes(limit, user_id, voice_profile_id))
+
+    def iter_idea_rows(self, columns: Tuple[str, ...], limit: int = 100, user_id: Optional[str] = None, voice_profile_id: Optional[str] = None) -> Iterator[sqlite3.Row]:
+        """Like iter_idea_nodes, but selects only `columns` and yields the raw sqlite3.Row.
+
+        For internal callers that index a few columns (row["node_id"]); skips the
+        per-row dict copy. Use iter_idea_nodes when the rows leave the process as JSON.
+        """
+        key = (columns, bool(user_id), bool(voice_profile_id))
+        sql = _SQL_LIST_IDEA_ROWS.get(key)
+        if sql is None:
+            if not columns or not all(_IDENT_RE.fullmatch(c) for c in columns):
+                raise ValueError(f"invalid column list: {columns!r}")
+            sql = _SQL_LIST_IDEAS[key[1:]].replace("SELECT *", "SELECT " + ", ".join(columns), 1)
+            _SQL_LIST_IDEA_ROWS[key] = sql
+        params: List[Any] = [p for p in (user_id, voice_profile_id) if p]
         params.append(limit)
-        cur.execute(sql, tuple(params))
-        return [dict(r) for r in cur.fetchall()]
+        return iter(self.connect().execute(sql, tuple(params)))
 
     def get_idea_by_request_key(self, user_id: str, request_key: str) -> Optional[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM idea_nodes WHERE user_id = ? AND request_key = ? ORDER BY created_at DESC LIMIT 1",
-            (user_id, request_key),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
+        """Return the most recent idea with the same (user_id, request_key) if it exists."""
+        return self._fetch_one(_SQL_IDEA_BY_REQUEST_KEY, (user_id, request_key))
 
     def delete_all_idea_nodes(self) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM idea_nodes")
-        conn.commit()
+        """Delete every idea together with all edges and idea link rows, in one transaction."""
+        def _run(conn: sqlite3.Connection) -> None:
+            # Clear dependents wholesale first so the per-row cascade trigger finds nothing to do
+            conn.execute(_SQL_DELETE_ALL_EDGES)
+            for sql in _SQL_DELETE_ALL_IDEA_LINKS:
+                conn.execute(sql)
+            conn.execute(_SQL_DELETE_ALL_IDEAS)
+
+        self._write(_run)
+
+    def get_idea_lists(self, node_id: str) -> Dict[str, List[str]]:
+        """Decoded tags / source_chunk_ids / source_file_ids for one idea, from the link tables.
+
+        Callers that need the lists use this instead of splitting the comma-joined columns;
+        listing paths that only show titles never pay for decoding.
+        """
+        cur = self._cursor()
+        return {
+            "tags": [r[0] for r in cur.execute(_SQL_TAGS_FOR_IDEA, (node_id,))],
+            "source_chunk_ids": [r[0] for r in cur.execute(_SQL_SOURCE_CHUNKS_FOR_IDEA, (node_id,))],
+            "source_file_ids": [r[0] for r in cur.execute(_SQL_SOURCE_FILES_FOR_IDEA, (node_id,))],
+        }
+
+    def list_idea_ids_by_tag(self, tag: str) -> List[str]:
+        """Node ids carrying an exact tag (index seek on idea_tags.tag)."""
+        return [r[0] for r in self._cursor().execute(_SQL_IDEA_IDS_BY_TAG, (tag,))]
 
     # Edges
     def create_edge(self, src_id: str, dst_id: str, edge_type: str, weight: float = 1.0, metadata: Optional[Dict[str, Any]] = None) -> str:
-        edge_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
-        conn = self.connect()
-        cur = conn.cursor()
-        self._ensure_table_columns(cur, "edges", {
-            "src_id": "TEXT",
-            "dst_id": "TEXT",
-            "edge_type": "TEXT",
-            "weight": "REAL",
-            "metadata": "TEXT",
-            "created_at": "TEXT",
-        })
-        cur.execute(
-            """
-            INSERT INTO edges (edge_id, src_id, dst_id, edge_type, weight, metadata, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (edge_id, src_id, dst_id, edge_type, float(weight), json.dumps(metadata or {}), now),
-        )
-        conn.commit()
+        assert self._schema_ready, "schema not initialized"
+        edge_id = _new_id()
+        now = _now_iso()
+        params = (edge_id, src_id, dst_id, edge_type, float(weight), _json_obj(metadata), now)
+        self._write(lambda conn: conn.execute(_SQL_INSERT_EDGE, params))
         return edge_id
 
+    def create_edge_returning(self, src_id: str, dst_id: str, edge_type: str, weight: float = 1.0, metadata: Optional[Dict[str, Any]] = None) -> Dict:
+        """Like create_edge, but returns the stored row instead of its id."""
+        assert self._schema_ready, "schema not initialized"
+        params = (_new_id(), src_id, dst_id, edge_type, float(weight), _json_obj(metadata), _now_iso())
+        return self._insert_returning(_SQL_INSERT_EDGE, _SQL_INSERT_EDGE_RETURNING, _SQL_EDGE_BY_ID, params)
+
+    def create_edges_bulk(self, edges: List[Tuple[str, str, str, float, Optional[Dict[str, Any]]]]) -> List[str]:
+        """Insert many (src_id, dst_id, edge_type, weight, metadata) edges in one transaction."""
+        assert self._schema_ready, "schema not initialized"
+        now = _now_iso()
+        edge_ids = _new_id_batch(len(edges))
+        rows = [
+            (edge_id, src_id, dst_id, edge_type, float(weight), _json_obj(metadata), now)
+            for edge_id, (src_id, dst_id, edge_type, weight, metadata) in zip(edge_ids, edges)
+        ]
+        if rows:
+            self._executemany_immediate(_SQL_INSERT_EDGE, rows)
+        return edge_ids
+
     def edge_exists(self, src_id: str, dst_id: str, edge_type: str) -> bool:
         """Return True if an edge of a given type already exists from src_id to dst_id."""
-        conn = self.connect()
-        cur = conn.cursor()
         try:
-            cur.execute(
-                "SELECT 1 FROM edges WHERE src_id = ? AND dst_id = ? AND edge_type = ? LIMIT 1",
-                (src_id, dst_id, edge_type),
-            )
-            return cur.fetchone() is not None
+            return self._first(_SQL_EDGE_EXISTS, (src_id, dst_id, edge_type)) is not None
         except Exception:
             return False
 
+    def iter_all_edges(self, limit: int = 1000) -> Iterator[Dict]:
+        for r in self.connect().execute(_SQL_LIST_EDGES, (limit,)):
+            yield dict(r)
+
     def list_all_edges(self, limit: int = 1000) -> List[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM edges ORDER BY created_at DESC LIMIT ?", (limit,))
-        return [dict(r) for r in cur.fetchall()]
+        return list(self.iter_all_edges(limit))
+
+    def iter_edges_for_node(self, node_id: str, limit: int = 1000) -> Iterator[Dict]:
+        for r in self.connect().execute(_SQL_EDGES_FOR_NODE, (node_id, limit, node_id, node_id, limit, limit)):
+            yield dict(r)
 
     def list_edges_for_node(self, node_id: str, limit: int = 1000) -> List[Dict]:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM edges WHERE src_id = ? OR dst_id = ? ORDER BY created_at DESC LIMIT ?",
-            (node_id, node_id, limit),
-        )
-        return [dict(r) for r in cur.fetchall()]
+        return list(self.iter_edges_for_node(node_id, limit))
 
     def delete_all_edges(self) -> None:
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM edges")
-        conn.commit()
+        self._write(lambda conn: conn.execute(_SQL_DELETE_ALL_EDGES))
 
 
@@ -2,8 +2,6 @@ from __future__ import annotations
 import argparse
 import json
 
-from core.crews.graph_agent import GraphAgent
-
 
 def main():
     
@@ -26,6 +24,18 @@ def main():
     s4.add_argument("--id", required=True, help="Node id (idea or cluster)")
 
     args = ap.parse_args()
+
+    if args.cmd == "list-edges":
+        # Read-only; SQLite alone, without loading Chroma or the embedding model
+        from core.database.sqlite_manager import SQLiteManager
+
+        edges = SQLiteManager().list_edges_for_node(args.id)
+        print(json.dumps(edges, ensure_ascii=False, indent=2))
+        return
+
+    # Deferred so argument errors and --help don't pay for chromadb/numpy imports
+    from core.crews.graph_agent import GraphAgent
+
     agent = GraphAgent()
     
     
@@ -36,7 +46,7 @@ def main():
         return
     
     if args.cmd == "autolink-recent":
-        res = agent.autolink_recent(Limit=args.limit, top_k=args.k)
+        res = agent.autolink_recent(limit=args.limit, top_k=args.k)
         
         print(json.dumps(res, ensure_ascii=False, indent=2))
         return
@@ -51,10 +61,5 @@ def main():
                 print(f"{c['cluster_id']}: {c['label']} (n={c['size']}) -> {', '.join(c['sample_titles'])}")
         return
     
-    if args.cmd == "list-edges":
-        edges = agent.db.list_edges_for_node(args.id)
-        print(json.dumps(edges, ensure_ascii=False, indent=2))
-        return
-    
 if __name__ == "__main__":
     main()
\ No newline at end of file
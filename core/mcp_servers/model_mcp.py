@@ -3,6 +3,7 @@ import json
 import argparse
 
 from core.crews.idea_agent import IdeaGeneratorAgent
+from core.models.generator import load_env_once
 
 def main():
     ap = argparse.ArgumentParser(description="Model MCP — Idea Generator")
@@ -14,6 +15,7 @@ def main():
     ap.add_argument("--tags", default="", help="Comma-separated tags to attach")
     ap.add_argument("--json", action="store_true", help="Print JSON result")
     args = ap.parse_args()
+    load_env_once()
     
     
     agent = IdeaGeneratorAgent(db_path=args.db)
@@ -1,40 +1,43 @@
 from __future__ import annotations
 import argparse
 import json
+import re
 from typing import Any, Dict, Optional
 
-from core.models.retrievers import SemanticRetriever
+from core.models.retrievers import get_retriever
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
 
 
+_INT_RE = re.compile(r"[+-]?\d+")
+_FLOAT_RE = re.compile(r"[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?")
+
+
+def _coerce(v: str) -> Any:
+    """bool / int / float for literal-looking values, else the string (no exception round trips)."""
+    low = v.lower()
+    if low in ("true", "false"):
+        return low == "true"
+    if _INT_RE.fullmatch(v):
+        return int(v)
+    if _FLOAT_RE.fullmatch(v):
+        return float(v)
+    return v
+
+
 def parse_where(where_str: Optional[str]) -> Optional[Dict[str, Any]]:
     if not where_str or not where_str.strip():
         return None
-    clauses = []
-    for part in [p.strip() for p in where_str.split(",") if p.strip()]:
-        if "=" not in part:
-            continue
-        k, v = part.split("=", 1)
-        k = k.strip()
-        v = v.strip()
-        if v.lower() in ("true", "false"):
-            val: Any = (v.lower() == "true")
-        else:
-            try:
-                val = int(v)
-            except ValueError:
-                try:
-                    val = float(v)
-                except ValueError:
-                    val = v
-        clauses.append({k: {"$eq": val}})
-    if not clauses:
+    conds: Dict[str, Any] = {}
+    for part in where_str.split(","):
+        k, sep, v = part.partition("=")
+        if sep and k.strip():
+            conds[k.strip()] = _coerce(v.strip())
+    if not conds:
         return None
-    if len(clauses) == 1:
-        k = next(iter(clauses[0].keys()))
-        return {k: clauses[0][k]}
-    return {"$and": clauses}
+    if len(conds) == 1:
+        return {k: {"$eq": v} for k, v in conds.items()}
+    return {"$and": [{k: {"$eq": v}} for k, v in conds.items()]}
 
 
 def main():
@@ -46,7 +49,7 @@ def main():
     ap.add_argument("--json", action="store_true", help="Output JSON")
     args = ap.parse_args()
 
-    retriever = SemanticRetriever(chroma=ChromaManager(), embedder=EmbeddingModel())
+    retriever = get_retriever(chroma=ChromaManager(), embedder=EmbeddingModel())
     where = parse_where(args.where)
     results = retriever.search_ideas(args.query, top_k=args.k, where=where) if args.type == "ideas" else retriever.search_chunks(args.query, top_k=args.k, where=where)
 
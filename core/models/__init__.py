@@ -1,8 +1,17 @@
 from .embeddings import EmbeddingModel  # optional
-# retriever may be optional in early phases
-try:
-    from .retrievers import SemanticRetriever
-except Exception:
-    SemanticRetriever = None  # type: ignore
 
-__all__ = ["EmbeddingModel", "SemanticRetriever"]
\ No newline at end of file
+
+def __getattr__(name):
+    # retriever may be optional in early phases; resolved on first use since it imports chromadb
+    if name in ("SemanticRetriever", "FlatRetriever"):
+        try:
+            from . import retrievers
+            value = getattr(retrievers, name)
+        except Exception:
+            value = None
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["EmbeddingModel", "SemanticRetriever", "FlatRetriever"]
\ No newline at end of file
@@ -1,7 +1,16 @@
 from __future__ import annotations
 import os
 import hashlib
-from typing import List, Optional
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.models.generator import load_env_once
 
 # Speed up imports and avoid TensorFlow/JAX heavy integrations from transformers
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")
@@ -11,11 +20,132 @@ os.environ.setdefault("TRANSFORMERS_NO_FLAX", "1")
 _HAS_ST = False
 SentenceTransformer = None  # type: ignore
 
+# Word-count buckets encoded separately, so short texts are not padded to a long one's length.
+_LEN_BUCKETS = (16, 32, 64, 128, 256, 512)
+# Keys per SELECT ... IN (...), under SQLite's default bound-parameter limit
+_CACHE_IN_MAX = 500
+
+
+class _EmbeddingCache:
+    """float32 vectors by 16-byte key in a small SQLite file, shared by all models in the process."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS emb_cache (key BLOB PRIMARY KEY, vec BLOB NOT NULL) WITHOUT ROWID;
+        """)
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        out: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(keys), _CACHE_IN_MAX):
+                part = keys[i:i + _CACHE_IN_MAX]
+                sql = f"SELECT key, vec FROM emb_cache WHERE key IN ({','.join('?' * len(part))})"
+                for k, v in self._conn.execute(sql, part):
+                    out[k] = np.frombuffer(v, dtype=np.float32)
+        return out
+
+    def put_many(self, items: List[Tuple[bytes, np.ndarray]]) -> None:
+        rows = [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO emb_cache (key, vec) VALUES (?, ?)", rows)
+
+
+_CACHES: Dict[str, Optional[_EmbeddingCache]] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _bucket_batches() -> Tuple[int, ...]:
+    """Batch size per length bucket, from IDEON_EMB_BATCH (texts per forward pass for ~64-word texts).
+
+    Scales inversely with the bucket bound to keep tokens per forward pass similar. Read on first
+    use, after .env is loaded, rather than at import.
+    """
+    load_env_once()
+    base = int(os.environ.get("IDEON_EMB_BATCH", "64"))
+    return tuple(max(8, min(256, base * 64 // b)) for b in _LEN_BUCKETS + (_LEN_BUCKETS[-1],))
+
+
+def _get_cache() -> Optional[_EmbeddingCache]:
+    # On-disk cache of sentence-transformers vectors keyed by (model, text); IDEON_EMB_CACHE="" disables it
+    load_env_once()
+    path = os.environ.get("IDEON_EMB_CACHE", "storage/sqlite/emb_cache.db")
+    if not path:
+        return None
+    key = os.path.abspath(path)
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            try:
+                _CACHES[key] = _EmbeddingCache(key)
+            except Exception:
+                _CACHES[key] = None  # unwritable location: run uncached
+        return _CACHES[key]
+
+
+@lru_cache(maxsize=65536)
+def _token_slot(token: str, dim: int) -> Tuple[int, float]:
+    """(index, value) a token adds to the hashing-fallback vector; tokens repeat, so cached.
+
+    Stays on SHA-256: changing the hash would change every fallback vector already stored
+    in Chroma. from_bytes on the raw digest equals int(hexdigest, 16) without the hex round trip.
+    """
+    h = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest(), "big")
+    return h % dim, ((h >> 8) % 1000) / 1000.0 - 0.5  # value in [-0.5, 0.5]
+
+
+class _OnnxEncoder:
+    """MiniLM-style sentence encoder on ONNX Runtime, exposing the subset of
+    SentenceTransformer.encode() that EmbeddingModel uses.
+
+    model_dir holds an `optimum-cli export onnx` output: model_quantized.onnx (int8) or
+    model.onnx, plus tokenizer.json.
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 256):
+        import onnxruntime as ort  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(path):
+            path = os.path.join(model_dir, "model.onnx")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        parts: List[np.ndarray] = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer.encode_batch(list(texts[i:i + batch_size]))
+            ids = np.asarray([e.ids for e in enc], dtype=np.int64)
+            mask = np.asarray([e.attention_mask for e in enc], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]
+            # Mean-pool over real tokens
+            m = mask[..., None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled /= np.clip(np.sqrt(np.einsum("ij,ij->i", pooled, pooled))[:, None], 1e-12, None)
+            parts.append(pooled.astype(np.float32))
+        return np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+
 
 class EmbeddingModel:
     """
     Local-first embedding model with graceful fallback.
-    Preferred: sentence-transformers (normalized embeddings).
+    Preferred: sentence-transformers (normalized embeddings), or an int8 ONNX export of
+    the same model when IDEON_EMB_BACKEND=onnx and IDEON_ONNX_MODEL point at one.
     Fallback: deterministic hashing to fixed-dim vector.
     """
 
@@ -25,9 +155,22 @@ class EmbeddingModel:
         self.model: Optional[object] = None
         self.dim = 384  # default for all-MiniLM-L6-v2
         self.available = False
+        self.backend = "hash"
+
+        load_env_once()
+        if os.environ.get("IDEON_EMB_BACKEND", "").lower() == "onnx":
+            onnx_dir = os.environ.get("IDEON_ONNX_MODEL") or os.path.join("storage", "onnx", model_name.rsplit("/", 1)[-1])
+            try:
+                self.model = _OnnxEncoder(onnx_dir)
+                self.dim = int(self.model.encode(["detect"]).shape[1])
+                self.available = True
+                self.backend = "onnx"
+            except Exception:
+                self.model = None
+                self.available = False
 
         # Only attempt heavy import when user explicitly opts in
-        use_st = os.environ.get(
+        use_st = not self.available and os.environ.get(
             "IDEON_USE_ST",
             os.environ.get("IDEAWEAVER_USE_ST", "0"),
         ).lower() in {"1", "true", "yes"}
@@ -45,6 +188,7 @@ class EmbeddingModel:
                     self.model = SentenceTransformer(model_name)
                     _ = self.model.encode(["ok"], normalize_embeddings=True)
                     self.available = True
+                    self.backend = "st"
                     try:
                         vec = self.model.encode(["detect"], normalize_embeddings=True)[0]
                         self.dim = len(vec)
@@ -60,29 +204,86 @@ class EmbeddingModel:
 
     def embed_text(self, text: str) -> List[float]:
         """Return a normalized embedding for a single text."""
-        text = (text or "").strip()
-        if self.available and self.model is not None:
-            v = self.model.encode([text], normalize_embeddings=True)[0]
-            return v.tolist()
-
-        # Deterministic hashing fallback
-        if not text:
-            vec = [0.0] * self.dim
-            vec[0] = 1.0
-            return vec
-
-        vec = [0.0] * self.dim
-        for token in text.split():
-            h = int(hashlib.sha256(token.encode("utf-8")).hexdigest(), 16)
-            idx = h % self.dim
-            val = ((h >> 8) % 1000) / 1000.0 - 0.5  # [-0.5, 0.5]
-            vec[idx] += val
-
-        # L2 normalize
-        norm = (sum(x * x for x in vec) ** 0.5) or 1.0
-        return [x / norm for x in vec]
+        return self.embed_texts([text])[0]
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        """Batch embed; preserves order."""
-        return [self.embed_text(t) for t in texts]
+        """Batch embed; preserves order.
+
+        With sentence-transformers, texts are grouped by length and each group is encoded in
+        one call, rather than one forward pass per text.
+        """
+        texts = [(t or "").strip() for t in texts]
+        if not texts:
+            return []
+        if self.available and self.model is not None:
+            return self._st_embed_cached(texts).tolist()
+        return self._hash_embed(texts).tolist()
+
+    def _st_embed_cached(self, texts: List[str]) -> np.ndarray:
+        """_st_embed, reusing vectors for texts this model has encoded before (any run)."""
+        cache = _get_cache()
+        if cache is None:
+            return self._st_embed(texts)
+        # ONNX int8 vectors differ slightly from the PyTorch model's, so backends never share entries
+        prefix = f"{self.backend}:{self.model_name}|".encode("utf-8")
+        keys = [hashlib.blake2b(prefix + t.encode("utf-8"), digest_size=16).digest() for t in texts]
+        try:
+            hits = cache.get_many(list(set(keys)))
+        except Exception:
+            hits = {}
+        # Encode each distinct missing text once
+        todo: Dict[bytes, int] = {}
+        for i, k in enumerate(keys):
+            if k not in hits and k not in todo:
+                todo[k] = i
+        if todo:
+            vecs = self._st_embed([texts[i] for i in todo.values()])
+            fresh = list(zip(todo.keys(), vecs))
+            hits.update(fresh)
+            try:
+                cache.put_many(fresh)
+            except Exception:
+                pass
+        return np.stack([hits[k] for k in keys])
+
+    def _st_embed(self, texts: List[str]) -> np.ndarray:
+        """sentence-transformers path: one encode() per length bucket, scattered back in order."""
+        buckets: Dict[int, List[int]] = defaultdict(list)
+        for i, t in enumerate(texts):
+            buckets[bisect_left(_LEN_BUCKETS, len(t.split()))].append(i)
+        out: Optional[np.ndarray] = None
+        for b, idxs in buckets.items():
+            vecs = self.model.encode(
+                [texts[i] for i in idxs],
+                batch_size=_bucket_batches()[b],
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=vecs.dtype)
+            out[idxs] = vecs
+        return out
 
+    def _hash_embed(self, texts: List[str]) -> np.ndarray:
+        """Deterministic hashing fallback for stripped texts, as an (N, dim) array."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float64)
+        rows: List[int] = []
+        idxs: List[int] = []
+        vals: List[float] = []
+        for r, text in enumerate(texts):
+            if not text:
+                out[r, 0] = 1.0
+                continue
+            for token in text.split():
+                idx, val = _token_slot(token, self.dim)
+                rows.append(r)
+                idxs.append(idx)
+                vals.append(val)
+        if vals:
+            np.add.at(out, (rows, idxs), vals)
+        # L2 normalize (all-zero rows stay zero)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        out /= norms
+        return out
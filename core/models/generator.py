@@ -3,48 +3,74 @@ import os
 import json
 import logging
 import re
+import threading
 from typing import Dict, List, Optional, Tuple
 
-# .env support
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except Exception:
-    pass
-
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO)
 
-# Environment toggles (support new IDEON_* and legacy IDEAWEAVER_* prefixes)
-USE_LLM = str(
-    os.getenv("IDEON_USE_LLM", os.getenv("IDEAWEAVER_USE_LLM", "0"))
-).lower() in {"1", "true", "yes"}
-LLM_MODEL = os.getenv("IDEON_LLM_MODEL", os.getenv("IDEAWEAVER_LLM_MODEL", "gpt-4.1-mini"))
-
-# Lazy LLM init
+# .env support, loaded on first need instead of at import so CLI --help stays fast. The flag is
+# set only once load_dotenv() has returned, so no thread reads settings before .env is applied.
+_ENV_LOCK = threading.Lock()
+_ENV_LOADED = False
+
+def load_env_once() -> None:
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    with _ENV_LOCK:
+        if _ENV_LOADED:
+            return
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except Exception:
+            pass
+        _ENV_LOADED = True
+
+# Lazy LLM init: the first successful client is kept for the process. A disabled or failed
+# setup is not remembered, so a later call retries (e.g. once OPENAI_API_KEY is set).
+_LLM_LOCK = threading.Lock()
 _LLM = None
 
-def get_llm():
-    global _LLM
-    if _LLM is not None:
-        return _LLM
-    if not USE_LLM:
+def _build_llm():
+    load_env_once()
+    # Environment toggles (support new IDEON_* and legacy IDEAWEAVER_* prefixes)
+    use_llm = str(
+        os.getenv("IDEON_USE_LLM", os.getenv("IDEAWEAVER_USE_LLM", "0"))
+    ).lower() in {"1", "true", "yes"}
+    if not use_llm:
         return None
+    llm_model = os.getenv("IDEON_LLM_MODEL", os.getenv("IDEAWEAVER_LLM_MODEL", "gpt-4.1-mini"))
     try:
         from langchain_openai import ChatOpenAI
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             logger.warning("[generator] OPENAI_API_KEY not set; using local generator")
             return None
-        _LLM = ChatOpenAI(api_key=api_key, model=LLM_MODEL, temperature=0.3)
-        logger.info("[generator] LLM enabled: %s", LLM_MODEL)
-        return _LLM
+        llm = ChatOpenAI(api_key=api_key, model=llm_model, temperature=0.3)
+        logger.info("[generator] LLM enabled: %s", llm_model)
+        return llm
     except Exception as e:
         logger.warning("[generator] Failed to initialize LLM (%s); using local generator", e)
-        _LLM = None
         return None
 
+def get_llm():
+    """The shared chat model, or None when the LLM is disabled or unavailable.
+
+    Once a client exists it is returned without locking; the lock only keeps concurrent
+    first calls from building two clients. Tests can reset it by setting _LLM = None.
+    """
+    global _LLM
+    llm = _LLM
+    if llm is not None:
+        return llm
+    with _LLM_LOCK:
+        if _LLM is None:
+            _LLM = _build_llm()
+        return _LLM
+
 # Utilities
 
 def _titleize(text: str) -> str:
@@ -59,11 +85,16 @@ def _snippet(txt: str, n: int = 220) -> str:
     return s if len(s) <= n else s[: n - 1] + "…"
 
 
+_CODE_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)```", re.IGNORECASE)
+# First "{" through last "}"
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
 def _unwrap_code_fence(text: str) -> str:
     if not text:
         return ""
     # Remove ```json ... ``` or ``` ... ``` fences
-    m = re.search(r"```(?:json)?\s*([\s\S]*?)```", text, re.IGNORECASE)
+    m = _CODE_FENCE_RE.search(text)
     return m.group(1).strip() if m else text.strip()
 
 
@@ -95,14 +126,24 @@ def _safe_json_from_text(text: str, default_title: str, default_tags: Optional[L
     if not t:
         return {"title": default_title, "content": "", "tags": default_tags}
 
-    # Unwrap code fences if present
-    t1 = _unwrap_code_fence(t)
-
-    # Try to find a JSON object anywhere in the text (prefer last)
-    m = re.search(r"\{[\s\S]*\}", t1)
-    candidate = m.group(0) if m else t1
+    # Fast path: well-behaved models return a bare JSON object
+    data = None
+    t1 = t
+    if t.startswith("{"):
+        try:
+            data = json.loads(t)
+        except ValueError:
+            data = None
+    if not isinstance(data, dict):
+        # Unwrap code fences if present
+        t1 = _unwrap_code_fence(t)
+        # Try to find a JSON object anywhere in the text
+        m = _JSON_OBJ_RE.search(t1)
+        try:
+            data = json.loads(m.group(0) if m else t1)
+        except ValueError:
+            data = None
     try:
-        data = json.loads(candidate)
         title = str(data.get("title") or default_title).strip()
         content = str(data.get("content") or "").strip()
         tags = data.get("tags") or []
@@ -1,8 +1,23 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from functools import lru_cache
+from itertools import chain, repeat
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss  # optional; exact flat index for unfiltered FlatRetriever searches
+except Exception:
+    faiss = None
 
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
+from core.models.generator import load_env_once
+
+# Distinct query strings whose embeddings each retriever keeps (repeat CLI/dashboard queries)
+_QUERY_CACHE_SIZE = 512
 
 
 class SemanticRetriever:
@@ -14,6 +29,22 @@ class SemanticRetriever:
         self.chroma = chroma or ChromaManager()
         self.embedder = embedder or EmbeddingModel()
 
+    @property
+    def embedder(self) -> EmbeddingModel:
+        return self._embedder
+
+    @embedder.setter
+    def embedder(self, embedder: EmbeddingModel) -> None:
+        # A fresh query cache per embedder, bound to it, so swapping models never serves stale
+        # vectors; tuples keep hits immutable
+        self._embedder = embedder
+        self._embed_query_cached = lru_cache(maxsize=_QUERY_CACHE_SIZE)(
+            lambda q: tuple(embedder.embed_text(q))
+        )
+
+    def _embed_query(self, query: Optional[str]) -> List[float]:
+        return list(self._embed_query_cached(query or ""))
+
     @staticmethod
     def _format_results(qr: Dict) -> List[Dict[str, Any]]:
         ids = qr.get("ids") or []
@@ -25,15 +56,12 @@ class SemanticRetriever:
             docs = docs[0] if docs else []
             metas = metas[0] if metas else []
             dists = dists[0] if dists else []
-        out: List[Dict[str, Any]] = []
-        for i, _id in enumerate(ids):
-            out.append({
-                "id": _id,
-                "document": docs[i] if i < len(docs) else None,
-                "metadata": metas[i] if i < len(metas) else {},
-                "distance": dists[i] if i < len(dists) else None,
-            })
-        return out
+        # Shorter columns are padded with None; ids decide the number of results
+        pad = repeat(None)
+        return [
+            {"id": _id, "document": d, "metadata": m or {}, "distance": dist}
+            for _id, d, m, dist in zip(ids, chain(docs, pad), chain(metas, pad), chain(dists, pad))
+        ]
 
     def search_chunks(
         self,
@@ -41,7 +69,7 @@ class SemanticRetriever:
         top_k: int = 5,
         where: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        emb = self.embedder.embed_text(query or "")
+        emb = self._embed_query(query)
         qr = self.chroma.query_chunks(query_embedding=emb, n_results=top_k, where=where if where else None)
         return self._format_results(qr)
 
@@ -51,6 +79,171 @@ class SemanticRetriever:
         top_k: int = 5,
         where: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        emb = self.embedder.embed_text(query or "")
+        emb = self._embed_query(query)
         qr = self.chroma.query_ideas(query_embedding=emb, n_results=top_k, where=where if where else None)
-        return self._format_results(qr)
\ No newline at end of file
+        return self._format_results(qr)
+
+class _Snapshot:
+    """One collection held in memory: ids, documents, metadatas and an (N, D) float32 matrix."""
+
+    def __init__(self, version: Tuple[int, int], ids: List[str], docs: List[Any], metas: List[Dict], mat: np.ndarray):
+        self.version = version
+        self.ids = ids
+        self.docs = docs
+        self.metas = metas
+        self.mat = mat
+        self.sq_norms = np.einsum("ij,ij->i", mat, mat) if mat.size else np.zeros(0, dtype=np.float32)
+        self.index = None
+        if faiss is not None and mat.size:
+            self.index = faiss.IndexFlatL2(mat.shape[1])
+            self.index.add(mat)
+
+
+def _match(md: Dict, where: Dict) -> Optional[bool]:
+    """Evaluate a Chroma where-filter against one metadata dict; None if it uses an unsupported operator."""
+    if "$and" in where:
+        out = True
+        for sub in where["$and"]:
+            r = _match(md, sub)
+            if r is None:
+                return None
+            out = out and r
+        return out
+    for key, cond in where.items():
+        if key.startswith("$"):
+            return None
+        v = md.get(key)
+        if not isinstance(cond, dict):
+            ok = v == cond
+        elif len(cond) != 1:
+            return None
+        elif "$eq" in cond:
+            ok = v == cond["$eq"]
+        elif "$ne" in cond:
+            ok = v != cond["$ne"]
+        elif "$in" in cond:
+            ok = v in cond["$in"]
+        else:
+            return None
+        if not ok:
+            return False
+    return True
+
+
+class FlatRetriever(SemanticRetriever):
+    """Exact search over an in-memory copy of each Chroma collection.
+
+    For small collections one matrix-vector product beats walking the HNSW graph, and results
+    are exact. Distances are squared L2 like Chroma's default space, so callers' thresholds
+    still apply. A collection is reloaded after any ChromaManager write in this process or a
+    change in its count; call refresh() after another process rewrites it without changing the
+    count. Filters with operators other than $eq/$ne/$in/$and go to Chroma.
+    """
+
+    def __init__(
+        self,
+        chroma: Optional[ChromaManager] = None,
+        embedder: Optional[EmbeddingModel] = None,
+    ):
+        super().__init__(chroma=chroma, embedder=embedder)
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+    def _snapshot(self, name: str) -> _Snapshot:
+        coll = getattr(self.chroma, name)
+        # Read the write count first: a write that lands during the load below bumps it again
+        writes = getattr(self.chroma, "write_count", 0)
+        try:
+            count = int(coll.count())
+        except Exception:
+            count = -1
+        version = (writes, count)
+        with self._lock:
+            snap = self._snapshots.get(name)
+            if snap is not None and snap.version == version:
+                return snap
+            resp = coll.get(include=["embeddings", "documents", "metadatas"]) or {}
+            embs = resp.get("embeddings")
+            mat = np.ascontiguousarray(np.asarray(embs if embs is not None else [], dtype=np.float32))
+            if mat.ndim != 2:
+                mat = np.zeros((0, 0), dtype=np.float32)
+            snap = _Snapshot(
+                version,
+                list(resp.get("ids") or []),
+                list(resp.get("documents") or []),
+                [m or {} for m in (resp.get("metadatas") or [])],
+                mat,
+            )
+            self._snapshots[name] = snap
+            return snap
+
+    def _search(self, name: str, query: str, top_k: int, where: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        snap = self._snapshot(name)
+        q = np.asarray(self._embed_query(query), dtype=np.float32)
+        if not snap.ids or snap.mat.shape[1] != q.shape[0] or top_k <= 0:
+            return []
+        rows: Optional[np.ndarray] = None
+        if where:
+            hits = [_match(md, where) for md in snap.metas]
+            if any(h is None for h in hits):
+                return None
+            rows = np.flatnonzero(hits)
+            if rows.size == 0:
+                return []
+        if rows is None and snap.index is not None:
+            dist, idx = snap.index.search(q[None, :], min(top_k, len(snap.ids)))
+            top, d = idx[0], dist[0]
+        else:
+            mat = snap.mat if rows is None else snap.mat[rows]
+            norms = snap.sq_norms if rows is None else snap.sq_norms[rows]
+            dists = norms - 2.0 * (mat @ q) + float(q @ q)
+            k = min(top_k, len(dists))
+            top = np.argpartition(dists, k - 1)[:k]
+            top = top[np.argsort(dists[top], kind="stable")]
+            d = np.maximum(dists[top], 0.0)
+            if rows is not None:
+                top = rows[top]
+        n_docs, n_metas = len(snap.docs), len(snap.metas)
+        return [
+            {
+                "id": snap.ids[i],
+                "document": snap.docs[i] if i < n_docs else None,
+                "metadata": snap.metas[i] if i < n_metas else {},
+                "distance": float(dist),
+            }
+            for i, dist in zip(top.tolist(), d.tolist())
+            if i >= 0
+        ]
+
+    def search_chunks(
+        self,
+        query: str,
+        top_k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        out = self._search("chunks", query, top_k, where)
+        return super().search_chunks(query, top_k=top_k, where=where) if out is None else out
+
+    def search_ideas(
+        self,
+        query: str,
+        top_k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        out = self._search("ideas", query, top_k, where)
+        return super().search_ideas(query, top_k=top_k, where=where) if out is None else out
+
+
+def get_retriever(
+    chroma: Optional[ChromaManager] = None,
+    embedder: Optional[EmbeddingModel] = None,
+) -> SemanticRetriever:
+    """The retriever selected by IDEON_RETRIEVER ("flat" for FlatRetriever, default SemanticRetriever)."""
+    load_env_once()
+    kind = os.environ.get("IDEON_RETRIEVER", "").strip().lower()
+    cls = FlatRetriever if kind == "flat" else SemanticRetriever
+    return cls(chroma=chroma, embedder=embedder)
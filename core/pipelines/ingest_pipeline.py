@@ -1,12 +1,18 @@
 import os
 import argparse
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, List, Optional, Tuple
 
 from core.database.sqlite_manager import SQLiteManager
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
 from core.utils.text_chunking import chunk_by_sentences, chunk_by_chars
-from core.utils.file_utils import iter_files_by_extensions, read_text_file, sha256_text
+from core.utils.file_utils import iter_files_by_extensions, read_text_file, sha256_file
+
+# Files read/chunked ahead of the one being embedded, and the threads doing it
+_PREFETCH_DEPTH = 4
+_PREFETCH_WORKERS = 2
 
 
 def _chunk_text(text: str) -> List[Tuple[int, int, str]]:
@@ -19,13 +25,25 @@ def _chunk_text(text: str) -> List[Tuple[int, int, str]]:
 
 def _already_ingested(db: SQLiteManager, content_hash: str, relpath: str) -> bool:
     try:
-        rows = db.get_source_files()
-        for r in rows:
-            if r.get("content_hash") == content_hash or r.get("filepath") == relpath:
-                return True
+        return db.source_file_exists(content_hash, relpath)
     except Exception:
-        pass
-    return False
+        return False
+
+
+def _prepare_file(db: SQLiteManager, fpath: str, relpath: str) -> Optional[Tuple[str, str, List[Tuple[int, int, str]]]]:
+    """Hash, read and chunk one file: the CPU/IO half of ingest, run ahead on worker threads.
+
+    The hash is taken from the raw bytes first, so a file that is already ingested is never
+    decoded or chunked; returns None for those.
+    """
+    content_hash = sha256_file(fpath)
+    try:
+        if _already_ingested(db, content_hash, relpath):
+            return None
+    finally:
+        db.close()  # this worker's read connection
+    text = read_text_file(fpath)
+    return text, content_hash, _chunk_text(text)
 
 
 def ingest_directory(
@@ -44,74 +62,82 @@ def ingest_directory(
     # Ensure a user exists (simple approach: create if not found)
     user_id = db.create_user(default_username)
 
-    for sub in subdirs:
-        folder = os.path.join(root_dir, sub)
-        if not os.path.isdir(folder):
-            continue
-
-        for fpath in iter_files_by_extensions(folder, extensions={".txt", ".md"}):
-            relpath = os.path.relpath(fpath).replace("\\", "/")
-            try:
-                text = read_text_file(fpath)
-            except Exception as e:
-                print(f"Skip unreadable file {relpath}: {e}")
-                continue
-
-            content_hash = sha256_text(text)
-            if _already_ingested(db, content_hash, relpath):
-                print(f"Skip duplicate {relpath}")
+    def _store(sub: str, fpath: str, relpath: str, prepared: Future) -> None:
+        try:
+            result = prepared.result()
+        except Exception as e:
+            print(f"Skip unreadable file {relpath}: {e}")
+            return
+
+        # Re-checked here: a file prefetched alongside its duplicate passed the worker's check
+        if result is None or _already_ingested(db, result[1], relpath):
+            print(f"Skip duplicate {relpath}")
+            return
+        text, content_hash, chunks = result
+
+        try:
+            file_size = os.path.getsize(fpath)
+        except Exception:
+            file_size = len(text.encode("utf-8", errors="ignore"))
+
+        category = "writing_sample" if sub == "writing_samples" else "note"
+
+        # FIX: pass uploaded_by=user_id
+        file_id = db.create_source_file(
+            filename=os.path.basename(fpath),
+            filepath=relpath,
+            file_type="text/plain",
+            file_size=file_size,
+            uploaded_by=user_id,
+            content_hash=content_hash,
+            category=category,
+            tags=[sub],
+        )
+
+        chunk_texts = [c for _, _, c in chunks]
+        # One embed call, one SQLite transaction and one Chroma add per file, not per chunk
+        embeddings = embedder.embed_texts(chunk_texts)
+        chunk_ids = db.create_doc_chunks_bulk(
+            file_id,
+            chunks,
+            chunk_type="paragraph",
+            metadata={"filepath": relpath, "category": category},
+        )
+
+        # Store embeddings in Chroma keyed by chunk_id
+        chroma.add_chunks_bulk(
+            ids=chunk_ids,
+            embeddings=embeddings,
+            documents=chunk_texts,
+            metadatas=[
+                {
+                    "source_file_id": file_id,
+                    "chunk_index": idx,
+                    "filepath": relpath,
+                    "category": category,
+                }
+                for idx in range(len(chunk_ids))
+            ],
+        )
+
+        db.update_source_file_status(file_id, "completed")
+        print(f"Ingested {relpath}: {len(chunks)} chunks")
+
+    # Files are read and chunked up to _PREFETCH_DEPTH ahead while the main thread embeds
+    # and writes the current one; dedup and all writes stay on this thread, in file order.
+    with ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS) as pool:
+        window: Deque[Tuple[str, str, str, Future]] = deque()
+        for sub in subdirs:
+            folder = os.path.join(root_dir, sub)
+            if not os.path.isdir(folder):
                 continue
-
-            try:
-                file_size = os.path.getsize(fpath)
-            except Exception:
-                file_size = len(text.encode("utf-8", errors="ignore"))
-
-            category = "writing_sample" if sub == "writing_samples" else "note"
-
-            # FIX: pass uploaded_by=user_id
-            file_id = db.create_source_file(
-                filename=os.path.basename(fpath),
-                filepath=relpath,
-                file_type="text/plain",
-                file_size=file_size,
-                uploaded_by=user_id,
-                content_hash=content_hash,
-                category=category,
-                tags=[sub],
-            )
-
-            chunks = _chunk_text(text)
-            for idx, (start, end, chunk) in enumerate(chunks):
-                embedding = embedder.embed_text(chunk)
-
-                # Create chunk record (SQLiteManager should compute content_length)
-                chunk_id = db.create_doc_chunk(
-                    source_file_id=file_id,
-                    content=chunk,
-                    chunk_index=idx,
-                    start_char=start,
-                    end_char=end,
-                    chunk_type="paragraph",
-                    embedding_id=None,
-                    metadata={"filepath": relpath, "category": category},
-                )
-
-                # Store embedding in Chroma keyed by chunk_id
-                chroma.add_chunk(
-                    chunk_id=chunk_id,
-                    embedding=embedding,
-                    content=chunk,
-                    metadata={
-                        "source_file_id": file_id,
-                        "chunk_index": idx,
-                        "filepath": relpath,
-                        "category": category,
-                    },
-                )
-
-            db.update_file_status(file_id, "completed")
-            print(f"Ingested {relpath}: {len(chunks)} chunks")
+            for fpath in iter_files_by_extensions(folder, extensions={".txt", ".md"}):
+                relpath = os.path.relpath(fpath).replace("\\", "/")
+                window.append((sub, fpath, relpath, pool.submit(_prepare_file, db, fpath, relpath)))
+                if len(window) > _PREFETCH_DEPTH:
+                    _store(*window.popleft())
+        while window:
+            _store(*window.popleft())
 
 
 def main():
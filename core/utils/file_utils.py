@@ -15,14 +15,31 @@ def iter_files_by_extensions(root: str, extensions: Optional[Iterable[str]] = No
 
 
 def read_text_file(path: str) -> str:
+    """Read a UTF-8 text file (undecodable bytes dropped) with universal newlines.
+
+    Bytes are read once and decoded in memory, so the lenient retry doesn't reopen the file.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        text = data.decode("utf-8")
     except UnicodeDecodeError:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        text = data.decode("utf-8", errors="ignore")
+    # Same newline handling as text-mode open()
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
 
 def sha256_text(text: str) -> str:
     return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
 
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file's bytes, streamed in blocks (no decoded or encoded copy)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
@@ -1,6 +1,11 @@
 import re
+from bisect import bisect_right
+from itertools import accumulate
 from typing import List, Tuple
 
+# Whitespace that follows sentence-ending punctuation
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
 
 def count_tokens_approx(text: str) -> int:
     """Approximate token count by whitespace split."""
@@ -11,8 +16,25 @@ def split_sentences(text: str) -> List[str]:
     """Naive sentence splitter using punctuation."""
     if not text:
         return []
-    parts = re.split(r'(?<=[.!?])\s+', text.strip())
-    return [p.strip() for p in parts if p.strip()]
+    # Splits consume the whole whitespace run and the input is stripped, so parts need no strip
+    return [p for p in _SENT_SPLIT.split(text.strip()) if p]
+
+
+def split_sentence_spans(text: str) -> List[Tuple[int, int, str]]:
+    """split_sentences with positions: (start_char, end_char, sentence) in one pass over text."""
+    if not text:
+        return []
+    lo = len(text) - len(text.lstrip())
+    hi = len(text.rstrip())
+    if lo >= hi:
+        return []
+    spans: List[Tuple[int, int, str]] = []
+    start = lo
+    for m in _SENT_SPLIT.finditer(text, lo, hi):
+        spans.append((start, m.start(), text[start:m.start()]))
+        start = m.end()
+    spans.append((start, hi, text[start:hi]))
+    return spans
 
 
 def chunk_by_chars(text: str, max_chars: int = 1200, overlap: int = 120) -> List[Tuple[int, int, str]]:
@@ -25,16 +47,12 @@ def chunk_by_chars(text: str, max_chars: int = 1200, overlap: int = 120) -> List
     if n == 0:
         return []
 
-    chunks: List[Tuple[int, int, str]] = []
-    start = 0
-    while start < n:
-        end = min(start + max_chars, n)
-        chunk = text[start:end]
-        chunks.append((start, end, chunk))
-        if end >= n:
-            break
-        start = max(0, end - overlap)
-    return chunks
+    # Windows start every `step` chars; the last one is the first that reaches the end of text.
+    # step is at least 1 so overlap >= max_chars can't stall the window.
+    max_chars = max(1, max_chars)
+    step = max(1, max_chars - overlap)
+    n_chunks = 1 if n <= max_chars else -(-(n - max_chars) // step) + 1
+    return [(s, min(s + max_chars, n), text[s:s + max_chars]) for s in range(0, n_chunks * step, step)]
 
 
 def chunk_by_sentences(
@@ -47,35 +65,19 @@ def chunk_by_sentences(
     Returns list of (start_char, end_char, chunk_text).
     """
     text = text or ""
-    sents = split_sentences(text)
-    if not sents:
+    spans = split_sentence_spans(text)
+    if not spans:
         return []
-
-    # Map sentence spans in original text
-    spans: List[Tuple[int, int]] = []
-    cursor = 0
-    for s in sents:
-        idx = text.find(s, cursor)
-        if idx == -1:
-            idx = text.find(s)
-        start = max(idx, 0)
-        end = start + len(s)
-        spans.append((start, end))
-        cursor = end
+    # cum[j] = tokens in sentences [0, j); a window's budget check is then one binary search
+    cum = [0, *accumulate(count_tokens_approx(s) for _, _, s in spans)]
 
     chunks: List[Tuple[int, int, str]] = []
     i = 0
-    n = len(sents)
+    n = len(spans)
     while i < n:
-        token_count = 0
         start_idx = i
-        j = i
-        while j < n:
-            tc = count_tokens_approx(sents[j])
-            if token_count + tc > max_tokens and j > i:
-                break
-            token_count += tc
-            j += 1
+        # Most sentences that fit the budget, but always at least one
+        j = max(bisect_right(cum, cum[i] + max_tokens, i, n + 1) - 1, i + 1)
 
         start_char = spans[start_idx][0]
         end_char = spans[j - 1][1]
@@ -1,4 +1,26 @@
 from __future__ import annotations
+import os
+import sys
+
+
+def _exec_gunicorn() -> None:
+	"""Replace this process with gunicorn serving run:app (no return unless gunicorn is missing).
+
+	One worker on purpose, as in the Dockerfile: SQLite writes and the Chroma client are owned by a
+	single process. gthread threads still serve requests concurrently.
+	"""
+	threads = os.environ.get("IDEON_THREADS", "4")
+	args = ["gunicorn", "-w", "1", "-k", "gthread", "--threads", threads, "-b", "127.0.0.1:5000", "run:app"]
+	try:
+		os.execvp("gunicorn", args)
+	except OSError as e:
+		print(f"[run] gunicorn unavailable ({e}); using the development server", file=sys.stderr)
+
+
+# Checked before create_app so the exec'ing process doesn't build an app it never serves
+if __name__ == "__main__" and os.environ.get("IDEON_PROD", "").lower() in {"1", "true", "yes"}:
+	_exec_gunicorn()
+
 from app import create_app
 
 app = create_app()
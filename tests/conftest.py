@@ -1,7 +1,27 @@
 import os
 import sys
 
+import pytest
+
 # Ensure project root is on sys.path for imports like `from core...`
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
 	sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="module")
+def db_manager(tmp_path_factory):
+	"""One SQLiteManager per test module, on a fresh database under pytest's tmp dir."""
+	from core.database import SQLiteManager
+
+	db = SQLiteManager(db_path=str(tmp_path_factory.mktemp("sqlite") / "test_metadata.db"))
+	yield db
+	db.close()
+
+
+@pytest.fixture(scope="session")
+def embedder():
+	"""One EmbeddingModel for the whole run; loading model weights dominates embedding tests."""
+	from core.models.embeddings import EmbeddingModel
+
+	return EmbeddingModel()
@@ -1,28 +1,24 @@
 import os
+import threading
+import time
 import uuid
-from core.database import SQLiteManager
-
-DB_PATH = "storage/sqlite/test_metadata.db"
+from concurrent.futures import ThreadPoolExecutor
 
-def setup_module(module):
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+import pytest
 
-def teardown_module(module):
-    try:
-        os.remove(DB_PATH)
-    except FileNotFoundError:
-        pass
+from core.database import SQLiteManager
+from core.database.sqlite_manager import _get_writer
 
-def test_sqlite_init_and_user_crud():
-    db = SQLiteManager(db_path=DB_PATH)
+def test_sqlite_init_and_user_crud(db_manager):
+    db = db_manager
     user_id = db.create_user("tester", {"theme": "dark"})
     fetched = db.get_user(user_id)
     assert fetched is not None
     assert fetched["user_id"] == user_id
     assert fetched["username"] == "tester"
 
-def test_source_file_insert_and_query():
-    db = SQLiteManager(db_path=DB_PATH)
+def test_source_file_insert_and_query(db_manager):
+    db = db_manager
     user_id = db.create_user("u")
     file_id = db.create_source_file(
         filename="test.txt",
@@ -35,4 +31,163 @@ def test_source_file_insert_and_query():
         tags=["tag1", "tag2"]
     )
     files = db.get_source_files()
-    assert any(f["file_id"] == file_id for f in files)
\ No newline at end of file
+    assert any(f["file_id"] == file_id for f in files)
+def test_reads_see_writes_after_multi_match_lookup(db_manager):
+    db = db_manager
+    db.create_user("dup")
+    db.create_user("dup")
+    assert db.get_user_by_username("dup") is not None  # two rows match; only one is fetched
+    before = len(db.get_source_files())
+    user_id = db.create_user("reader")
+    file_id = db.create_source_file(
+        filename="fresh.txt",
+        filepath="data/notes/fresh.txt",
+        file_type="text/plain",
+        file_size=5,
+        uploaded_by=user_id,
+        content_hash=str(uuid.uuid4()),
+        category="note",
+    )
+    files = db.get_source_files()
+    assert len(files) == before + 1
+    assert any(f["file_id"] == file_id for f in files)
+    # Matches twice (hash of one row, path of another), then must not hide the next write
+    db.create_source_file(
+        filename="fresh.txt",
+        filepath="data/notes/fresh.txt",
+        file_type="text/plain",
+        file_size=5,
+        uploaded_by=user_id,
+        content_hash=files[0]["content_hash"],
+        category="note",
+    )
+    assert db.source_file_exists(files[0]["content_hash"], "data/notes/fresh.txt")
+    db.create_source_file(
+        filename="later.txt",
+        filepath="data/notes/later.txt",
+        file_type="text/plain",
+        file_size=5,
+        uploaded_by=user_id,
+        content_hash=str(uuid.uuid4()),
+        category="note",
+    )
+    assert len(db.get_source_files()) == before + 3
+
+
+def test_concurrent_writes_all_land(db_manager):
+    db = db_manager
+    before = len(db.get_source_files())
+    user_id = db.create_user("writer")
+
+    def add(i):
+        return db.create_source_file(
+            filename=f"t{i}.txt",
+            filepath=f"data/notes/t{i}.txt",
+            file_type="text/plain",
+            file_size=1,
+            uploaded_by=user_id,
+            content_hash=str(uuid.uuid4()),
+            category="note",
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(add, range(100)))
+    assert len(set(ids)) == 100
+    assert len(db.get_source_files()) == before + 100
+
+
+def test_write_job_error_reaches_caller(db_manager):
+    db = db_manager
+
+    def boom(conn):
+        conn.execute("INSERT INTO users (user_id, username, created_at, updated_at) VALUES ('x', 'boom', 'now', 'now')")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        db._write(boom)
+    assert db.get_user("x") is None
+    # The writer keeps serving after a failed job
+    assert db.get_user(db.create_user("after-error")) is not None
+
+
+def test_replaced_db_file_stops_old_writer(tmp_path):
+    path = str(tmp_path / "replaced.db")
+    db = SQLiteManager(db_path=path)
+    db.create_user("first")
+    old = _get_writer(path)
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = SQLiteManager(db_path=path)
+    old._thread.join(5)
+    assert not old._thread.is_alive()
+    assert _get_writer(path) is not old
+    assert db.get_user(db.create_user("second")) is not None
+    db.close()
+
+
+def test_failing_job_in_group_commit_rolls_back_alone(tmp_path):
+    path = str(tmp_path / "group.db")
+    db = SQLiteManager(db_path=path)
+    writer = _get_writer(path)
+    started, release = threading.Event(), threading.Event()
+
+    def hold(conn):
+        started.set()
+        return release.wait(5)
+
+    def insert(user_id, fail=False):
+        def job(conn):
+            conn.execute(
+                "INSERT INTO users (user_id, username, created_at, updated_at) VALUES (?, ?, 'now', 'now')",
+                (user_id, user_id),
+            )
+            if fail:
+                raise ValueError(user_id)
+            return user_id
+        return job
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # Hold the writer so the next three jobs queue up and are taken as one batch
+        blocker = pool.submit(writer.submit, hold)
+        assert started.wait(5)
+        futs = [pool.submit(writer.submit, insert(uid, fail=uid == "bad")) for uid in ("a", "bad", "c")]
+        deadline = time.monotonic() + 5
+        while writer._queue.qsize() < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer._queue.qsize() == 3
+        release.set()
+        blocker.result()
+        assert futs[0].result() == "a"
+        with pytest.raises(ValueError):
+            futs[1].result()
+        assert futs[2].result() == "c"
+
+    assert db.get_user("a") is not None
+    assert db.get_user("bad") is None
+    assert db.get_user("c") is not None
+    db.close()
+
+
+@pytest.mark.parametrize("has_returning", [True, False])
+def test_upsert_idea_node_is_idempotent_per_request_key(db_manager, monkeypatch, has_returning):
+    from core.database import sqlite_manager
+
+    monkeypatch.setattr(sqlite_manager, "_HAS_RETURNING", has_returning and sqlite_manager._HAS_RETURNING)
+    db = db_manager
+    user_id = db.create_user(f"upserter-{has_returning}")
+    node_id, created = db.upsert_idea_node(user_id, "Title", "Body", ["t"], request_key="req-1")
+    again_id, created_again = db.upsert_idea_node(user_id, "Title 2", "Body 2", ["t"], request_key="req-1")
+    assert created is True
+    assert (again_id, created_again) == (node_id, False)
+    count = db.connect().execute(
+        "SELECT COUNT(*) FROM idea_nodes WHERE user_id = ? AND request_key = ?", (user_id, "req-1")
+    ).fetchone()[0]
+    assert count == 1
+
+    # Without a request key every call inserts a new idea
+    a = db.upsert_idea_node(user_id, "Free", "Body", [], request_key=None)
+    b = db.upsert_idea_node(user_id, "Free", "Body", [], request_key=None)
+    assert a[1] is True and b[1] is True
+    assert a[0] != b[0]
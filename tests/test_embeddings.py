@@ -1,4 +1,10 @@
-from core.models.embeddings import EmbeddingModel
+import os
+import threading
+import time
+
+import dotenv
+
+from core.models import generator
 from core.utils.text_chunking import (
     count_tokens_approx,
     split_sentences,
@@ -7,8 +13,8 @@ from core.utils.text_chunking import (
 )
 
 
-def test_embedding_determinism_and_shape():
-    model = EmbeddingModel()
+def test_embedding_determinism_and_shape(embedder):
+    model = embedder
     v1 = model.embed_text("Hello world, this is a test.")
     v2 = model.embed_text("Hello world, this is a test.")
     assert isinstance(v1, list)
@@ -19,8 +25,8 @@ def test_embedding_determinism_and_shape():
     assert abs(norm - 1.0) < 1e-6
 
 
-def test_batch_embeddings():
-    model = EmbeddingModel()
+def test_batch_embeddings(embedder):
+    model = embedder
     vecs = model.embed_texts(["a", "b", "c"])
     assert len(vecs) == 3
     assert all(len(v) == model.dim for v in vecs)
@@ -49,4 +55,34 @@ def test_text_chunking_by_sentences():
 
 
 def test_token_count_approx():
-    assert count_tokens_approx("a b  c\nd") == 4
\ No newline at end of file
+    assert count_tokens_approx("a b  c\nd") == 4
+
+
+def test_load_env_once_blocks_concurrent_callers_until_loaded(monkeypatch):
+    # A caller arriving while .env is still loading must wait for it, not read settings early
+    monkeypatch.setattr(generator, "_ENV_LOADED", False)
+    monkeypatch.delenv("IDEON_TEST_ENV_LOADED", raising=False)
+    loads = []
+
+    def slow_load_dotenv(*args, **kwargs):
+        loads.append(1)
+        time.sleep(0.05)
+        os.environ["IDEON_TEST_ENV_LOADED"] = "1"
+        return True
+
+    monkeypatch.setattr(dotenv, "load_dotenv", slow_load_dotenv)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        generator.load_env_once()
+        seen.append(os.environ.get("IDEON_TEST_ENV_LOADED"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == ["1"] * 8
+    assert len(loads) == 1
@@ -0,0 +1,22 @@
+import numpy as np
+
+from core.utils.graph_utils import kmeans, kmeans_np
+
+
+def test_kmeans_reseeds_empty_clusters_without_touching_input():
+    # Two distinct points repeated; with k=4 some centroids duplicate each other and
+    # lose every member to the first of them, so recompute has to reseed empty clusters
+    vectors = np.array([[1.0, 0.0]] * 6 + [[0.0, 1.0]] * 6, dtype=np.float32)
+    original = vectors.copy()
+    for seed in range(20):
+        labels, centroids = kmeans_np(vectors, k=4, max_iter=10, seed=seed)
+        assert labels.shape == (12,)
+        assert centroids.shape == (4, 2)
+        assert 0 <= labels.min() and labels.max() < 4
+        np.testing.assert_array_equal(vectors, original)
+
+
+def test_kmeans_list_api():
+    labels, centroids = kmeans([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9]], k=2, seed=0)
+    assert isinstance(labels, list) and isinstance(centroids, list)
+    assert labels[0] == labels[1] and labels[2] == labels[3] and labels[0] != labels[2]
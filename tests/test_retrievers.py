@@ -0,0 +1,107 @@
+import pytest
+
+from core.database.chroma_manager import ChromaManager
+from core.models.retrievers import FlatRetriever, SemanticRetriever, _match
+
+
+_IDEAS = [
+    ("i1", "solar panels on every rooftop", {"voice_profile_id": "a", "n": 1}),
+    ("i2", "community gardens in empty lots", {"voice_profile_id": "a", "n": 2}),
+    ("i3", "bike lanes that connect the suburbs", {"voice_profile_id": "b", "n": 3}),
+    ("i4", "rainwater tanks for apartment blocks", {"voice_profile_id": "b", "n": 4}),
+]
+
+
+class _ConstEmbedder:
+    """Embeds every text to the same fixed vector, counting calls."""
+
+    def __init__(self, vec):
+        self.vec = list(vec)
+        self.calls = 0
+
+    def embed_text(self, text):
+        self.calls += 1
+        return list(self.vec)
+
+
+@pytest.fixture
+def chroma(tmp_path):
+    return ChromaManager(persist_directory=str(tmp_path / "chromadb"))
+
+
+def _add_ideas(chroma, embedder, ideas):
+    for node_id, text, md in ideas:
+        chroma.add_idea(node_id, embedder.embed_text(text), text, md)
+
+
+def test_query_cache_follows_embedder_swap(chroma):
+    first = _ConstEmbedder([1.0, 0.0])
+    retriever = SemanticRetriever(chroma=chroma, embedder=first)
+    assert retriever._embed_query("q") == [1.0, 0.0]
+    assert retriever._embed_query("q") == [1.0, 0.0]
+    assert first.calls == 1
+
+    second = _ConstEmbedder([0.0, 1.0])
+    retriever.embedder = second
+    assert retriever.embedder is second
+    assert retriever._embed_query("q") == [0.0, 1.0]
+    assert second.calls == 1
+
+
+def test_flat_search_matches_semantic_ids_and_distances(chroma, embedder):
+    _add_ideas(chroma, embedder, _IDEAS)
+    flat = FlatRetriever(chroma=chroma, embedder=embedder)
+    semantic = SemanticRetriever(chroma=chroma, embedder=embedder)
+
+    got = flat.search_ideas("gardens and rooftops", top_k=4)
+    want = semantic.search_ideas("gardens and rooftops", top_k=4)
+    assert [r["id"] for r in got] == [r["id"] for r in want]
+    for g, w in zip(got, want):
+        assert g["document"] == w["document"]
+        assert g["distance"] == pytest.approx(w["distance"], abs=1e-4)
+
+
+def test_flat_search_applies_where_filter(chroma, embedder):
+    _add_ideas(chroma, embedder, _IDEAS)
+    flat = FlatRetriever(chroma=chroma, embedder=embedder)
+
+    unfiltered = flat.search_ideas("city ideas", top_k=10)
+    assert {r["id"] for r in unfiltered} == {"i1", "i2", "i3", "i4"}
+
+    filtered = flat.search_ideas("city ideas", top_k=10, where={"voice_profile_id": "b"})
+    assert {r["id"] for r in filtered} == {"i3", "i4"}
+    assert all(r["metadata"]["voice_profile_id"] == "b" for r in filtered)
+    # Filtered distances are the same rows' distances from the unfiltered search
+    by_id = {r["id"]: r["distance"] for r in unfiltered}
+    assert all(r["distance"] == pytest.approx(by_id[r["id"]]) for r in filtered)
+
+    both = {"$and": [{"voice_profile_id": {"$in": ["a", "b"]}}, {"n": {"$ne": 2}}]}
+    assert {r["id"] for r in flat.search_ideas("city ideas", top_k=10, where=both)} == {"i1", "i3", "i4"}
+    assert flat.search_ideas("city ideas", top_k=10, where={"voice_profile_id": "z"}) == []
+
+
+def test_flat_search_unsupported_operator_falls_back_to_chroma(chroma, embedder):
+    _add_ideas(chroma, embedder, _IDEAS)
+    where = {"n": {"$gt": 2}}
+    assert _match(_IDEAS[0][2], where) is None
+
+    flat = FlatRetriever(chroma=chroma, embedder=embedder)
+    semantic = SemanticRetriever(chroma=chroma, embedder=embedder)
+    got = flat.search_ideas("city ideas", top_k=10, where=where)
+    assert {r["id"] for r in got} == {"i3", "i4"}
+    assert got == semantic.search_ideas("city ideas", top_k=10, where=where)
+
+
+def test_flat_snapshot_reloads_after_writes(chroma, embedder):
+    flat = FlatRetriever(chroma=chroma, embedder=embedder)
+    _add_ideas(chroma, embedder, _IDEAS[:2])
+    assert {r["id"] for r in flat.search_ideas("city ideas", top_k=10)} == {"i1", "i2"}
+
+    # Count changes
+    _add_ideas(chroma, embedder, _IDEAS[2:3])
+    assert {r["id"] for r in flat.search_ideas("city ideas", top_k=10)} == {"i1", "i2", "i3"}
+
+    # Same count, different contents: picked up through the manager's write count
+    chroma.clear_ideas()
+    _add_ideas(chroma, embedder, [_IDEAS[3], _IDEAS[0], _IDEAS[1]])
+    assert {r["id"] for r in flat.search_ideas("city ideas", top_k=10)} == {"i1", "i2", "i4"}
@@ -1,18 +1,32 @@
 import argparse
-import json
 import sqlite3
 from pathlib import Path
 from pprint import pprint
 import chromadb
 
+try:
+    from orjson import loads as _jloads  # optional; C parser for the per-row JSON columns
+except ImportError:
+    from json import loads as _jloads
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_DB = BASE_DIR / "storage" / "sqlite" / "metadata.db"
 DEFAULT_CHROMA = BASE_DIR / "storage" / "chromadb"
+# Ids (or rows, when listing everything) per Chroma get call
+_GET_BATCH = 512
+# Read-only tuning for the bulk scans below: large page cache, mmap'd reads, in-memory temp b-trees
+_READ_PRAGMAS = """
+    PRAGMA query_only=1;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA temp_store=MEMORY;
+"""
 
 def list_sqlite_voice_profiles(db_path: Path):
     if not db_path.exists():
         raise FileNotFoundError(f"DB not found at: {db_path}")
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(db_path.resolve().as_uri() + "?mode=ro", uri=True)
+    conn.executescript(_READ_PRAGMAS)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute("""
@@ -28,22 +42,34 @@ def list_sqlite_voice_profiles(db_path: Path):
     for r in rows:
         item = dict(r)
         try:
-            item["source_file_ids"] = json.loads(item.get("source_file_ids") or "[]")
+            item["source_file_ids"] = _jloads(item.get("source_file_ids") or "[]")
         except Exception:
             pass
         try:
-            item["analysis_metrics"] = json.loads(item.get("analysis_metrics") or "{}")
+            item["analysis_metrics"] = _jloads(item.get("analysis_metrics") or "{}")
         except Exception:
             pass
         out.append(item)
     return out
 
 def list_chroma_voice_profiles(chroma_dir: Path, ids=None):
+    """Voice profile records from Chroma, fetched in pages of _GET_BATCH ids or rows."""
     client = chromadb.PersistentClient(path=str(chroma_dir))
     coll = client.get_or_create_collection("voice_profiles")
+    include = ["metadatas", "documents"]
     if ids:
-        return coll.get(ids=ids, include=["metadatas", "documents"])
-    return coll.get(include=["metadatas", "documents"])
+        pages = (coll.get(ids=ids[i:i + _GET_BATCH], include=include) for i in range(0, len(ids), _GET_BATCH))
+    else:
+        pages = (coll.get(include=include, limit=_GET_BATCH, offset=i) for i in range(0, coll.count(), _GET_BATCH))
+    out = {"ids": [], "metadatas": [], "documents": []}
+    for page in pages:
+        n = len(page.get("ids") or [])
+        out["ids"].extend(page.get("ids") or [])
+        # Pad short columns so positions stay aligned with ids across pages
+        for key in ("metadatas", "documents"):
+            col = list(page.get(key) or [])
+            out[key].extend(col[:n] + [None] * (n - len(col)))
+    return out
 
 def main():
     ap = argparse.ArgumentParser()
@@ -68,7 +94,7 @@ def main():
     docs = data.get("documents") or []
     metas = data.get("metadatas") or []
     for i, pid in enumerate(data.get("ids", [])):
-        md = metas[i] if i < len(metas) else {}
+        md = (metas[i] if i < len(metas) else None) or {}
         doc = docs[i] if i < len(docs) else ""
         print(f"- {pid} | doc={repr(doc)} | profile_name={md.get('profile_name')}")
 
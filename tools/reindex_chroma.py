@@ -1,13 +1,31 @@
 import argparse
-import json
 import sqlite3
 from pathlib import Path
 
 from core.database.chroma_manager import ChromaManager
 from core.models.embeddings import EmbeddingModel
 
+try:
+    from orjson import loads as _jloads  # optional; C parser for the per-row JSON columns
+except ImportError:
+    from json import loads as _jloads
+
+# Chunks fetched, embedded and added to Chroma per round trip
+_PAGE_ROWS = 1000
+# Read-only tuning for the bulk scans below: large page cache, mmap'd reads, in-memory temp b-trees
+_READ_PRAGMAS = """
+    PRAGMA query_only=1;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA temp_store=MEMORY;
+"""
+
 def reindex(db_path: Path):
-    conn = sqlite3.connect(str(db_path))
+    chroma = ChromaManager()
+    embedder = EmbeddingModel()
+
+    conn = sqlite3.connect(db_path.resolve().as_uri() + "?mode=ro", uri=True)
+    conn.executescript(_READ_PRAGMAS)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute("""
@@ -17,29 +35,32 @@ def reindex(db_path: Path):
         JOIN source_files sf ON sf.file_id = dc.source_file_id
         ORDER BY sf.filepath, dc.chunk_index
     """)
-    rows = cur.fetchall()
-    conn.close()
-
-    chroma = ChromaManager()
-    embedder = EmbeddingModel()
-
     added = 0
-    for r in rows:
-        chunk_id = r["chunk_id"]
-        content = r["content"] or ""
-        try:
-            md = json.loads(r["metadata"] or "{}")
-        except Exception:
-            md = {}
-        md.update({
-            "source_file_id": r["file_id"],
-            "chunk_index": r["chunk_index"],
-            "filepath": r["filepath"],
-            "category": r["category"],
-        })
-        emb = embedder.embed_text(content)
-        chroma.add_chunk(chunk_id=chunk_id, embedding=emb, content=content, metadata=md)
-        added += 1
+    try:
+        # Streamed in pages; each page is embedded in one batch and written with one bulk add
+        while True:
+            rows = cur.fetchmany(_PAGE_ROWS)
+            if not rows:
+                break
+            ids, contents, metas = [], [], []
+            for r in rows:
+                try:
+                    md = _jloads(r["metadata"] or "{}")
+                except Exception:
+                    md = {}
+                md.update({
+                    "source_file_id": r["file_id"],
+                    "chunk_index": r["chunk_index"],
+                    "filepath": r["filepath"],
+                    "category": r["category"],
+                })
+                ids.append(r["chunk_id"])
+                contents.append(r["content"] or "")
+                metas.append(md)
+            chroma.add_chunks_bulk(ids, embedder.embed_texts(contents), contents, metas)
+            added += len(ids)
+    finally:
+        conn.close()
     print(f"Reindexed {added} chunks into Chroma.")
 
 if __name__ == "__main__":